@@ -210,6 +210,15 @@ async def _shutdown():
     except Exception as e:
         log.warning("[workers] shutdown stop_all error: %r", e)
 
+    # 3) The runtime worker runs in its own process group, so Ctrl+C never reaches it
+    try:
+        from ext.worker import stop_worker
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, stop_worker)
+        log.info("[runtime] worker stopped")
+    except Exception as e:
+        log.warning("[runtime] worker stop failed: %r", e)
+
 @app.middleware("http")
 async def _capture_auth_headers(request: Request, call_next):
     auth = (request.headers.get("authorization") or "").strip()
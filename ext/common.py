@@ -6,10 +6,14 @@ import json
 import os
 import platform as py_platform
 import platform
+import stat
 import sys
+import tempfile
 import urllib.parse
 import urllib.request
+from functools import cache, lru_cache
 from pathlib import Path
+from typing import NamedTuple
 
 from aimodel.core.settings import SETTINGS
 
@@ -103,6 +107,7 @@ def _sha256_bytes(b: bytes) -> str:
 # ----------------------------
 # OS helpers
 # ----------------------------
+@cache
 def current_os() -> str:
     s = py_platform.system().lower()
     if s.startswith("win"):
@@ -128,7 +133,13 @@ def base_mapping(os_name: str) -> tuple[Path, Path]:
     wheels = WHEELS_ROOT / OS_DIR[os_name] / "base"
     return req, wheels
 
-def venv_paths(os_name: str, backend: str) -> tuple[Path, Path, Path]:
+class VenvPaths(NamedTuple):
+    vroot: Path
+    py: Path
+    pip: Path
+
+@lru_cache(maxsize=16)
+def venv_paths(os_name: str, backend: str) -> VenvPaths:
     vroot = RUNTIMES_DIR / os_name / backend / ".venv"
     if current_os() == "windows":
         py = vroot / "Scripts" / "python.exe"
@@ -136,7 +147,43 @@ def venv_paths(os_name: str, backend: str) -> tuple[Path, Path, Path]:
     else:
         py = vroot / "bin" / "python"
         pip = vroot / "bin" / "pip"
-    return vroot, py, pip
+    return VenvPaths(vroot, py, pip)
+
+# mkstemp creates 0600 files; read the umask once so replaced files keep the usual mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _replace_mode(path: Path) -> int:
+    """Mode for the file replacing `path`: its current mode, else what open() would give."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    """
+    Write via a temp file in the same dir + os.replace, so concurrent readers
+    (e.g. /api/runtime/status polling) never see a torn or empty file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + ".", suffix=".tmp")
+    try:
+        # newline="" so Windows doesn't translate line endings on the way out
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _replace_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def _atomic_write_json(path: Path, data: dict) -> None:
+    _atomic_write_text(path, json.dumps(data, indent=2))
 
 def read_active_runtime() -> dict | None:
     try:
@@ -195,6 +242,7 @@ __all__ = [
     "RUNTIMES_DIR", "ACTIVE_JSON",
     "REQ_ROOT", "WHEELS_ROOT", "OS_DIR", "VALID", "STAMP_NAME",
     "_http_get", "_get_json", "_sha256_bytes",
-    "current_os", "mapping", "base_mapping", "venv_paths", "read_active_runtime",
+    "_atomic_write_text", "_atomic_write_json",
+    "current_os", "mapping", "base_mapping", "VenvPaths", "venv_paths", "read_active_runtime",
     "build_cf_manifest_url", "build_cf_wheel_url", "build_cf_pack_url",
 ]
@@ -5,7 +5,7 @@ import sys
 import io
 import json
 import os
-import shutil
+import re
 import subprocess
 import tempfile
 import time
@@ -25,6 +25,7 @@ from .common import (
     mapping,
     venv_paths,
     _get_json,
+    _atomic_write_json,
     _http_get,
     _sha256_bytes,
 )
@@ -79,6 +80,57 @@ def _run_pip(cmd: list[str], stream: bool = False):
         proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
         return proc.stdout or "", proc.stderr or ""
 
+REQUIRED_PIP = (24, 0)
+
+def _venv_pip_version(vroot: Path) -> str | None:
+    """Read pip's version from its dist-info dir name — no interpreter spawn."""
+    site_dirs = [vroot / "Lib" / "site-packages", *vroot.glob("lib/python*/site-packages")]
+    for sp in site_dirs:
+        for d in sp.glob("pip-*.dist-info"):
+            return d.name[len("pip-"):-len(".dist-info")]
+    return None
+
+def _ensure_pip(py: Path, vroot: Path, wheel_dirs: list[Path]):
+    """
+    Upgrade pip only when the venv's copy is older than REQUIRED_PIP; saves a
+    full pip round-trip on every (re)provision. Uses a shipped pip wheel when the
+    wheel dirs have one, otherwise (or if that fails) upgrades online as before.
+    """
+    have = _venv_pip_version(vroot)
+    m = re.match(r"(\d+)\.(\d+)", have or "")
+    if m and (int(m.group(1)), int(m.group(2))) >= REQUIRED_PIP:
+        _log(f"[runtime:provision] pip {have} is recent enough; skipping upgrade")
+        return
+    local = [d for d in wheel_dirs if d.exists() and any(d.glob("pip-*.whl"))]
+    if local:
+        cmd = [str(py), "-m", "pip", "install", "--no-compile", "--upgrade", "--no-index"]
+        for d in local:
+            cmd += ["--find-links", str(d)]
+        try:
+            _run_pip(cmd + ["pip"], stream=False)
+            return
+        except subprocess.CalledProcessError:
+            _log("[runtime:provision] offline pip upgrade failed; trying online")
+    try:
+        _run_pip([str(py), "-m", "pip", "install", "--no-compile", "--upgrade", "pip"], stream=False)
+    except subprocess.CalledProcessError:
+        _log("[runtime:provision] pip upgrade failed (ignored)")
+
+def _compile_bytecode(py: Path, vroot: Path):
+    """
+    Byte-compile the venv once, in parallel, after pip ran with --no-compile.
+    Best-effort: pip would have silently skipped unparsable modules too.
+    """
+    lib = vroot / ("Lib" if current_os() == "windows" else "lib")
+    if not lib.exists():
+        return
+    cmd = [str(py), "-m", "compileall", "-q", "-j", "0", str(lib)]
+    _log(f"[runtime:compile] {' '.join(cmd)}")
+    try:
+        subprocess.run(cmd, check=False, capture_output=not LOG_DEBUG)
+    except Exception as e:
+        _log(f"[runtime:compile] compileall failed (ignored): {e}")
+
 def _normalize_wheel_dirs(wheels: Path | Iterable[Path]) -> list[Path]:
     wheel_dirs = [wheels] if isinstance(wheels, Path) else list(wheels)
     wheel_dirs = [Path(p) for p in wheel_dirs]
@@ -104,7 +156,7 @@ def _offline_install(pip: Path, req: Path, wheels: Path | Iterable[Path]):
     env["PIP_DISABLE_PIP_VERSION_CHECK"] = "1"
     env["PIP_ONLY_BINARY"] = ":all:"
 
-    cmd = [str(pip), "install", "--no-index"]
+    cmd = [str(pip), "install", "--no-index", "--no-compile"]
     for d in wheel_dirs:
         cmd += ["--find-links", str(d)]
     cmd += ["-r", str(req)]
@@ -128,14 +180,12 @@ def provision_runtime(os_name: str, backend: str, python_exe: str | None = None)
     req_backend, wheels_backend = mapping(os_name, backend)
     vroot, py, pip = ensure_venv(os_name, backend, python_exe)
 
-    # pip upgrade (best-effort)
-    try:
-        _run_pip([str(py), "-m", "pip", "install", "--upgrade", "pip"], stream=False)
-    except subprocess.CalledProcessError:
-        _log("[runtime:provision] pip upgrade failed (ignored)")
+    req_base, wheels_base = base_mapping(os_name)
+
+    # pip upgrade (best-effort, skipped when the venv's pip is already new enough)
+    _ensure_pip(py, vroot, [wheels_backend, wheels_base])
 
     # Optional base layer first
-    req_base, wheels_base = base_mapping(os_name)
     if req_base.exists() and wheels_base.exists() and any(wheels_base.glob("*.whl")):
         _offline_install(pip, req_base, wheels_base)
     else:
@@ -145,6 +195,7 @@ def provision_runtime(os_name: str, backend: str, python_exe: str | None = None)
     # (e.g., diskcache needed by llama-cpp-python)
     wheel_search = [wheels_backend, wheels_base]
     _offline_install(pip, req_backend, wheel_search)
+    _compile_bytecode(py, vroot)
 
     # write stamp
     stamp = {
@@ -153,11 +204,13 @@ def provision_runtime(os_name: str, backend: str, python_exe: str | None = None)
         "python": str(py),
         "installed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
     }
-    _stamp_path(os_name, backend).write_text(json.dumps(stamp, indent=2))
+    _atomic_write_json(_stamp_path(os_name, backend), stamp)
 
     # active.json (best-effort)
-    ACTIVE_JSON.parent.mkdir(parents=True, exist_ok=True)
-    ACTIVE_JSON.write_text(json.dumps(stamp, indent=2))
+    try:
+        _atomic_write_json(ACTIVE_JSON, stamp)
+    except OSError as e:
+        _log(f"[runtime:provision] active.json write failed (ignored): {e}")
     _log(f"[runtime:provision] complete backend={backend} venv={vroot}")
     return {"ok": True, "venv": str(vroot), "manifest": stamp}
 
@@ -232,17 +285,14 @@ def fetch_runtime_pack(os_name: str, backend: str, version: str, url: str, sha25
 def provision_runtime_versioned(os_name: str, backend: str, version: str, python_exe: str | None = None) -> dict:
     vroot, py, pip = ensure_venv(os_name, backend, python_exe)
 
-    try:
-        _run_pip([str(py), "-m", "pip", "install", "--upgrade", "pip"], stream=False)
-    except subprocess.CalledProcessError:
-        _log("[runtime:versioned] pip upgrade failed (ignored)")
-
     req_base, _ = base_mapping(os_name)
     req_backend, _ = mapping(os_name, backend)
 
     base_wheels_dir = _base_dir_for_pack(os_name, backend, version)
     be_wheels_dir   = _backend_dir_for_pack(os_name, backend, version)
 
+    _ensure_pip(py, vroot, [be_wheels_dir, base_wheels_dir])
+
     # Base from pack (if present)
     if req_base.exists() and base_wheels_dir.exists() and any(base_wheels_dir.glob("*.whl")):
         _offline_install(pip, req_base, base_wheels_dir)
@@ -253,6 +303,7 @@ def provision_runtime_versioned(os_name: str, backend: str, version: str, python
     if not (be_wheels_dir.exists() and any(be_wheels_dir.glob("*.whl"))):
         raise FileNotFoundError(f"No backend wheels found at {be_wheels_dir}")
     _offline_install(pip, req_backend, [be_wheels_dir, base_wheels_dir])
+    _compile_bytecode(py, vroot)
 
     stamp = {
         "platform": os_name,
@@ -261,15 +312,31 @@ def provision_runtime_versioned(os_name: str, backend: str, version: str, python
         "version": version,
         "installed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
     }
-    _stamp_path(os_name, backend).write_text(json.dumps(stamp, indent=2))
-    ACTIVE_JSON.parent.mkdir(parents=True, exist_ok=True)
-    ACTIVE_JSON.write_text(json.dumps(stamp, indent=2))
+    _atomic_write_json(_stamp_path(os_name, backend), stamp)
+    try:
+        _atomic_write_json(ACTIVE_JSON, stamp)
+    except OSError as e:
+        _log(f"[runtime:versioned] active.json write failed (ignored): {e}")
     _log(f"[runtime:versioned] complete backend={backend} version={version} venv={vroot}")
     return {"ok": True, "venv": str(vroot), "manifest": stamp}
 
 # ----------------------------
 # Incremental wheel install (from CF manifest)
 # ----------------------------
+# prefer numpy first, typing_extensions next, llama last
+_PRIO_PATTERNS = [
+    (re.compile(r"^numpy-", re.I), 0),
+    (re.compile(r"^typing_extensions-", re.I), 1),
+    (re.compile(r"^llama[_-]cpp[_-]python-", re.I), 9),
+]
+
+def _wheel_prio(path: str) -> int:
+    name = os.path.basename(path)
+    for rx, prio in _PRIO_PATTERNS:
+        if rx.match(name):
+            return prio
+    return 5
+
 def install_wheels_into_backend(
     backend: str,
     wheels: list[dict],
@@ -290,30 +357,23 @@ def install_wheels_into_backend(
       - cleans temp files
     """
     os_name = current_os()
-    vroot, _py, pip = venv_paths(os_name, backend)
+    vroot, py, pip = venv_paths(os_name, backend)
     if not vroot.exists():
         raise RuntimeError(f"Backend {backend} venv not found; install it once first.")
 
-    # prefer numpy first, typing_extensions next, llama last
-    def _prio(path: str) -> int:
-        name = path.rsplit("/", 1)[-1].lower()
-        if name.startswith("numpy-"): return 0
-        if name.startswith("typing_extensions-"): return 1
-        if name.startswith(("llama_cpp_python-", "llama-cpp-python-")): return 9
-        return 5
-
     # basic schema sanity
     if not isinstance(wheels, list) or not all(isinstance(x, dict) and "path" in x for x in wheels):
         raise RuntimeError("Bad wheels schema: expected a list of {'path': ..., 'sha256'?: ...}")
 
-    wheels_sorted = sorted(wheels, key=lambda w: _prio(w["path"]))
-    tmp_dirs: list[str] = []
+    wheels_sorted = sorted(wheels, key=lambda w: _wheel_prio(w["path"]))
     installed: list[str] = []
 
     if LOG_DEBUG:
         print(f"[runtime:manifest] installing {len(wheels_sorted)} wheel(s) into {backend} venv", flush=True)
 
-    try:
+    # one shared temp dir for every wheel (filenames embed name/version/tags, so no collisions);
+    # cleanup is best-effort like before: AV/indexers can still hold a fresh .whl on Windows
+    with tempfile.TemporaryDirectory(prefix="rt_wheels_", ignore_cleanup_errors=True) as tmp_root:
         for w in wheels_sorted:
             wheel_key = w["path"]
             wheel_name = wheel_key.split("/")[-1]
@@ -331,16 +391,14 @@ def install_wheels_into_backend(
                 raise RuntimeError(f"sha256 mismatch for {wheel_key}: expected={want_hash} got={got_hash}")
 
             # write to temp with REAL filename so pip recognizes tags
-            tmp_dir = tempfile.mkdtemp(prefix="rt_wheels_")
-            tmp_dirs.append(tmp_dir)
-            tmp_path = os.path.join(tmp_dir, wheel_name)
+            tmp_path = os.path.join(tmp_root, wheel_name)
             with open(tmp_path, "wb") as f:
                 f.write(blob)
             if LOG_DEBUG:
                 print(f"[runtime:wheel] wrote {tmp_path} ({len(blob)} bytes)", flush=True)
 
             # build pip cmd — strictly offline
-            cmd = [str(pip), "install"]
+            cmd = [str(pip), "install", "--no-compile"]
             if no_deps:
                 cmd += ["--no-deps"]
             if force:
@@ -377,13 +435,8 @@ def install_wheels_into_backend(
             if LOG_DEBUG:
                 print(f"[runtime:wheel] installed {wheel_name}", flush=True)
 
-    finally:
-        # tidy up temp dirs
-        for d in tmp_dirs:
-            try:
-                shutil.rmtree(d, ignore_errors=True)
-            except Exception:
-                pass
+    if installed:
+        _compile_bytecode(py, vroot)
 
     return {"ok": True, "backend": backend, "installed": installed, "venv": str(vroot)}
 
@@ -408,7 +461,7 @@ def apply_runtime_manifest(backend: str, version: str, *, restart: bool = True)
         except Exception:
             meta = {}
     meta.update({"version": version})
-    stamp_path.write_text(json.dumps(meta, indent=2))
+    _atomic_write_json(stamp_path, meta)
     _log(f"[runtime:manifest] stamped version={version} at {stamp_path}")
 
     if restart:
@@ -1,7 +1,7 @@
 # ext/runtime_api.py
 from __future__ import annotations
 
-import os, json, urllib.request
+import os, json, time, urllib.request
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from pathlib import Path
@@ -9,10 +9,11 @@ import subprocess
 
 # ✅ import from the new split modules
 from .common import (
+    ACTIVE_JSON,
+    _atomic_write_json,
     current_os,
     read_active_runtime,
     venv_paths,
-    RUNTIMES_DIR,
     VALID,
 )
 from .provision import (
@@ -33,14 +34,26 @@ from .worker import (
 
 router = APIRouter(prefix="/api/runtime", tags=["runtime"])
 
+# The UI polls /status every second or two; collapse those polls into one scan.
+_STATUS_TTL_S = 1.0
+_status_cache: dict = {"t": 0.0, "v": None}
+
+def _invalidate_status():
+    _status_cache["t"] = 0.0
+
 @router.get("/status")
 def get_status():
+    now = time.monotonic()
+    if _status_cache["v"] is not None and now - _status_cache["t"] < _STATUS_TTL_S:
+        return _status_cache["v"]
     os_name = current_os()
     s = status()
     s["platform"] = os_name
     s["active"] = read_active_runtime()
     s["allowed"] = VALID.get(os_name, [])
     s["installed"] = list_provisioned_backends(os_name)  # provisioned = ready to run
+    _status_cache["v"] = s
+    _status_cache["t"] = now
     return s
 
 @router.post("/install")
@@ -56,6 +69,8 @@ def post_install(
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"install failed: {e}")
+    finally:
+        _invalidate_status()
 
 @router.post("/switch")
 def post_switch(
@@ -81,20 +96,22 @@ def post_switch(
         # update active.json
         try:
             _, py, _ = venv_paths(os_name, backend)
-            (RUNTIMES_DIR / "active.json").parent.mkdir(parents=True, exist_ok=True)
-            (RUNTIMES_DIR / "active.json").write_text(
-                json.dumps({"python": str(py), "backend": backend, "os": os_name}, indent=2)
-            )
+            _atomic_write_json(ACTIVE_JSON, {"python": str(py), "backend": backend, "os": os_name})
         except Exception:
             pass
 
         return out
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"start failed: {e}")
+    finally:
+        _invalidate_status()
 
 @router.post("/stop")
 def post_stop():
-    return stop_worker()
+    try:
+        return stop_worker()
+    finally:
+        _invalidate_status()
 
 @router.post("/fetch-by-url")
 def post_fetch_by_url(
@@ -144,6 +161,8 @@ def post_install_from_url(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"install-from-url failed: {e}")
+    finally:
+        _invalidate_status()
 
 @router.post("/install-from-cf")
 def post_install_from_cf(
@@ -186,6 +205,8 @@ def post_install_from_cf(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"install-from-cf (manifest) failed: {e}")
+    finally:
+        _invalidate_status()
 
 @router.get("/catalog")
 def get_runtime_catalog():
@@ -210,6 +231,8 @@ def post_apply_delta(
         return apply_runtime_manifest(backend, version, restart=restart)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"delta apply failed: {e}")
+    finally:
+        _invalidate_status()
 
 @router.post("/install-wheels")
 def post_install_wheels(
@@ -237,6 +260,8 @@ def post_install_wheels(
         return {"ok": True, "backend": backend, "count": len(wheel_urls)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"install-wheels failed: {e}")
+    finally:
+        _invalidate_status()
     
 @router.get("/logs")
 def get_runtime_logs(limit: int = Query(2000, ge=100, le=20000)):
@@ -250,10 +275,10 @@ def get_runtime_logs(limit: int = Query(2000, ge=100, le=20000)):
 def get_worker_log_tail(n: int = 4000):
     """Return the last N bytes of the runtime worker's stdout/stderr."""
     try:
-        from .worker import worker_log_tail
-        tail = worker_log_tail(max_bytes=max(200, min(n, 200_000)))
-        # FastAPI will JSON-escape by default; return as plain text:
+        from .worker import worker_log_tail_bytes
+        tail = worker_log_tail_bytes(max_bytes=max(200, min(n, 200_000)))
+        # FastAPI will JSON-escape by default; return as plain text (bytes go out as-is):
         from fastapi.responses import PlainTextResponse
-        return PlainTextResponse(tail or "(no worker output yet)")
+        return PlainTextResponse(tail or b"(no worker output yet)")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"failed to read worker log tail: {e}")
\ No newline at end of file
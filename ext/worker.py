@@ -1,25 +1,26 @@
 # ext/worker.py
 from __future__ import annotations
 
-import ctypes
 import json
 import os
 import platform
+import shutil
+import signal
 import socket
 import subprocess
 import sys
 import time
-import urllib.request
-from ctypes.util import find_library
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import Optional
-from collections import deque
+from typing import NamedTuple, Optional
+from queue import SimpleQueue
 from threading import Thread, Lock
 
 from .common import (
     ACTIVE_JSON,
     SETTINGS,
     VALID,
+    _atomic_write_json,
     current_os,
     venv_paths,
 )
@@ -35,75 +36,178 @@ _worker_proc: Optional[subprocess.Popen] = None
 _worker_info: Optional[dict] = None
 
 # keep an in-memory log tail so we can return it on errors / via API
-_LOG_TAIL_MAX = int(os.getenv("LM_WORKER_LOG_TAIL_BYTES", "100000"))  # ~100 KB by default
-_LOG_TAIL = deque()            # type: ignore[var-annotated]  # list[str] chunks
-_LOG_LOCK = Lock()
+# fixed-size byte ring: appends are one or two slice copies, no scans or per-line objects
+_LOG_TAIL_MAX = max(1, int(os.getenv("LM_WORKER_LOG_TAIL_BYTES", "100000")))  # ~100 KB by default
+_LOG_BUF = bytearray(_LOG_TAIL_MAX)
+_LOG_POS = 0          # next write offset
+_LOG_FULL = False     # ring has wrapped at least once
+_LOG_LOCK = Lock()    # held only for the copy; the pump thread is not the only writer
 _LOG_FILE_PATH = os.getenv("LM_WORKER_LOG_FILE", "").strip()  # optional tee to file
+_LOG_TEE_Q: Optional[SimpleQueue] = SimpleQueue() if _LOG_FILE_PATH else None
+
+def _log_tee_loop():
+    # drain the tee queue on its own thread so a slow disk never stalls the pump
+    assert _LOG_TEE_Q is not None
+    while True:
+        chunks = [_LOG_TEE_Q.get()]
+        while not _LOG_TEE_Q.empty():
+            chunks.append(_LOG_TEE_Q.get())
+        try:
+            with open(_LOG_FILE_PATH, "ab") as f:
+                f.write(b"".join(chunks))
+        except Exception:
+            pass
+
+if _LOG_TEE_Q is not None:
+    Thread(target=_log_tee_loop, name="lm-worker-log-tee", daemon=True).start()
+
+def _log_tail_append_bytes(b: bytes):
+    global _LOG_POS, _LOG_FULL
+    n = len(b)
+    if not n:
+        return
+    with _LOG_LOCK:
+        if n >= _LOG_TAIL_MAX:
+            _LOG_BUF[:] = b[-_LOG_TAIL_MAX:]
+            _LOG_POS = 0
+            _LOG_FULL = True
+        else:
+            end = _LOG_POS + n
+            if end <= _LOG_TAIL_MAX:
+                _LOG_BUF[_LOG_POS:end] = b
+            else:
+                split = _LOG_TAIL_MAX - _LOG_POS
+                _LOG_BUF[_LOG_POS:] = b[:split]
+                _LOG_BUF[:n - split] = b[split:]
+            if end >= _LOG_TAIL_MAX:
+                _LOG_FULL = True
+            _LOG_POS = end % _LOG_TAIL_MAX
+    if _LOG_TEE_Q is not None:
+        _LOG_TEE_Q.put(b)
 
 def _log_tail_append(s: str):
-    # maintain a rough byte budget; we store by lines/chunks for simplicity
+    _log_tail_append_bytes(s.encode("utf-8", "replace"))
+
+def _tail_snapshot(max_bytes: int) -> tuple[bytes, bool]:
+    """Copy the newest <= max_bytes out of the ring; also report whether older bytes were cut."""
     with _LOG_LOCK:
-        _LOG_TAIL.append(s)
-        # trim if we exceed budget
-        total = sum(len(x) for x in _LOG_TAIL)
-        while total > _LOG_TAIL_MAX and _LOG_TAIL:
-            dropped = _LOG_TAIL.popleft()
-            total -= len(dropped)
-        # optional tee to file
-        if _LOG_FILE_PATH:
-            try:
-                with open(_LOG_FILE_PATH, "a", encoding="utf-8", errors="replace") as f:
-                    f.write(s)
-            except Exception:
-                pass
+        filled = _LOG_TAIL_MAX if _LOG_FULL else _LOG_POS
+        n = min(max(0, max_bytes), filled)
+        end = _LOG_POS
+        start = end - n
+        with memoryview(_LOG_BUF) as mv:
+            if start >= 0:
+                data = bytes(mv[start:end])
+            else:
+                data = bytes(mv[start + _LOG_TAIL_MAX:]) + bytes(mv[:end])
+    return data, n < filled
+
+def worker_log_tail_bytes(max_bytes: int = 4000) -> bytes:
+    """Newest tail bytes, trimmed so a cut-off tail never starts mid-line or mid-character."""
+    data, cut = _tail_snapshot(max_bytes)
+    if cut:
+        # start at a line boundary when there is one
+        nl = data.find(b"\n")
+        if 0 <= nl < len(data) - 1:
+            return data[nl + 1:]
+        # otherwise at least skip the continuation bytes of a split UTF-8 sequence
+        i = 0
+        while i < min(3, len(data)) and 0x80 <= data[i] <= 0xBF:
+            i += 1
+        data = data[i:]
+    return data
 
 def worker_log_tail(max_bytes: int = 4000) -> str:
-    with _LOG_LOCK:
-        buf = "".join(_LOG_TAIL)
-    # return last max_bytes
-    if len(buf) <= max_bytes:
-        return buf
-    return buf[-max_bytes:]
+    return worker_log_tail_bytes(max_bytes).decode("utf-8", "replace")
 
 def _pump_stream(proc: subprocess.Popen):
     # single stream because we pipe stderr->stdout
     try:
         if proc.stdout is None:
             return
-        for line in iter(proc.stdout.readline, ""):
-            if not line:
+        # raw block reads straight into the ring; decoding happens on tail read
+        fd = proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
                 break
-            _log_tail_append(line)
+            _log_tail_append_bytes(chunk)
     except Exception as _e:
         _log_tail_append(f"[worker:pump] stream error: {_e}\n")
 
 def _wait_health(port: int, timeout_s: float = 10.0) -> bool:
-    url = f"http://127.0.0.1:{port}/healthz"
-    deadline = time.time() + timeout_s
-    while time.time() < deadline:
-        try:
-            with urllib.request.urlopen(url, timeout=1) as r:
-                data = json.loads(r.read().decode())
-                if data.get("ok"):
+    import http.client
+
+    deadline = time.monotonic() + timeout_s
+    attempt = 0
+    # one keep-alive connection across retries; a refused connect fails in microseconds,
+    # so it doubles as the TCP readiness probe
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=0.25)
+    try:
+        while time.monotonic() < deadline:
+            try:
+                conn.request("GET", "/healthz")
+                r = conn.getresponse()
+                body = r.read(512)
+                r.close()
+                if r.status == 200 and json.loads(body).get("ok"):
                     return True
-        except Exception:
-            time.sleep(0.2)
-    return False
+            except Exception:
+                conn.close()  # reconnects on the next request()
+            # exponential backoff: 10 ms, 20 ms, ... capped at 200 ms
+            time.sleep(min(0.01 * (1 << min(attempt, 5)), 0.2))
+            attempt += 1
+        return False
+    finally:
+        conn.close()
 
 def pick_free_port() -> int:
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.bind(("127.0.0.1", 0))
         return s.getsockname()[1]
 
+_IS_WIN = os.name == "nt"
+# own process group (Windows) / session (POSIX) so stop_worker can signal the whole tree
+_SPAWN_KW: dict = (
+    {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    if _IS_WIN
+    else {"start_new_session": True}
+)
+
+_BACKEND_ENV: dict[str, dict[str, str]] = {
+    "cpu": {"LLAMA_ACCEL": "cpu", "CUDA_VISIBLE_DEVICES": "-1"},
+    "cuda": {"LLAMA_ACCEL": "cuda", "GGML_CUDA": "1"},
+    "metal": {"LLAMA_ACCEL": "metal"},
+    "rocm": {"LLAMA_ACCEL": "hip"},
+}
+_BACKEND_ENV_DROP: dict[str, tuple[str, ...]] = {
+    "cpu": ("GGML_CUDA",),
+    "cuda": ("CUDA_VISIBLE_DEVICES",),
+}
+
+@lru_cache(maxsize=1)
+def _env_template() -> dict[str, str]:
+    # snapshot the parent env on first launch (after .env has been loaded at boot);
+    # each start then does one plain dict copy instead of os.environ.copy()
+    return dict(os.environ)
+
+@lru_cache(maxsize=1)
+def _internal_root() -> tuple[Path, bool]:
+    # When packaged, sys.executable points at .../resources/localmind-backend.exe
+    # Our code (ext, aimodel, etc.) is under .../resources/_internal
+    try:
+        exe_dir = Path(sys.executable).resolve().parent
+        internal_root = (exe_dir / "_internal").resolve()
+    except Exception:
+        internal_root = Path(".").resolve()
+    return internal_root, internal_root.exists()
+
 def start_worker(os_name: str, backend: str, port: int | None = None) -> dict:
     """
     Launches the already-provisioned runtime worker (CPU/CUDA/…).
     Works in both dev and packaged (Electron + PyInstaller) by deriving the
     packaged source root (…/resources/_internal) from the backend executable.
     """
-    import sys
-    from pathlib import Path
-
     global _worker_proc, _worker_info
 
     # Stop any existing worker first
@@ -118,22 +222,19 @@ def start_worker(os_name: str, backend: str, port: int | None = None) -> dict:
         port = pick_free_port()
 
     # ---------- Locate packaged source root ----------
-    # When packaged, sys.executable points at .../resources/localmind-backend.exe
-    # Our code (ext, aimodel, etc.) is under .../resources/_internal
-    try:
-        exe_dir = Path(sys.executable).resolve().parent
-        internal_root = (exe_dir / "_internal").resolve()
-    except Exception:
-        internal_root = Path(".").resolve()
-
-    internal_exists = internal_root.exists()
+    internal_root, internal_exists = _internal_root()
 
     # ---------- Build environment for the worker ----------
     _, py, _ = venv_paths(os_name, backend)
-    env = os.environ.copy()
-    env["BACKEND"] = backend
-    env["LM_RUNTIME_PYTHON"] = str(py)
-    env["PYTHONIOENCODING"] = "utf-8"  # avoid Windows console encoding issues
+    env = {
+        **_env_template(),
+        **_BACKEND_ENV.get(backend, {}),  # backend-specific accelerators
+        "BACKEND": backend,
+        "LM_RUNTIME_PYTHON": str(py),
+        "PYTHONIOENCODING": "utf-8",  # avoid Windows console encoding issues
+    }
+    for k in _BACKEND_ENV_DROP.get(backend, ()):
+        env.pop(k, None)
 
     # Make packaged modules importable inside the worker (ext, aimodel, …)
     if internal_exists:
@@ -142,35 +243,18 @@ def start_worker(os_name: str, backend: str, port: int | None = None) -> dict:
             + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
         )
 
-    # Backend-specific accelerators
-    if backend == "cpu":
-        env["LLAMA_ACCEL"] = "cpu"
-        env["CUDA_VISIBLE_DEVICES"] = "-1"
-        env.pop("GGML_CUDA", None)
-    elif backend == "cuda":
-        env["LLAMA_ACCEL"] = "cuda"
-        env["GGML_CUDA"] = "1"
-        env.pop("CUDA_VISIBLE_DEVICES", None)
-    elif backend == "metal":
-        env["LLAMA_ACCEL"] = "metal"
-    elif backend == "rocm":
-        env["LLAMA_ACCEL"] = "hip"
-
     # Use _internal as the CWD so relative imports/assets resolve
     worker_cwd = str(internal_root if internal_exists else Path(".").resolve())
 
     # ---------- Launch worker ----------
     _worker_proc = subprocess.Popen(
-        [str(py), "-m", "uvicorn", "ext.ai_service:app",
-         "--host", "127.0.0.1", "--port", str(port)],
+        [str(py), "-m", "uvicorn", "ext.ai_service:app", "--host", "127.0.0.1", "--port", str(port)],
         cwd=worker_cwd,
         env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        bufsize=1,
+        bufsize=0,
+        **_SPAWN_KW,
     )
 
     # Pump logs to in-memory tail
@@ -181,9 +265,12 @@ def start_worker(os_name: str, backend: str, port: int | None = None) -> dict:
     if not _wait_health(port):
         tail = worker_log_tail(4000)
         try:
-            _worker_proc.terminate()
+            _signal_worker_group(_worker_proc, hard=True)
+            _worker_proc.wait(timeout=5)
         except Exception:
             pass
+        _worker_proc = None
+        _worker_info = None
         raise RuntimeError("Worker failed health check.\n--- worker log tail ---\n" + tail)
 
     _worker_info = {"os": os_name, "backend": backend, "port": port}
@@ -191,16 +278,42 @@ def start_worker(os_name: str, backend: str, port: int | None = None) -> dict:
     return {"ok": True, **_worker_info}
 
 
+def _signal_worker_group(proc: subprocess.Popen, *, hard: bool):
+    # the worker runs in its own process group/session, so helpers it spawned go down with it
+    if _IS_WIN:
+        if hard:
+            # TerminateProcess only hits the worker itself; taskkill /T takes its children too
+            try:
+                r = subprocess.run(
+                    ["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                    capture_output=True, timeout=10,
+                )
+                if r.returncode != 0:
+                    proc.kill()
+            except Exception:
+                proc.kill()
+        else:
+            proc.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        os.killpg(os.getpgid(proc.pid), signal.SIGKILL if hard else signal.SIGTERM)
+
 def stop_worker() -> dict:
     global _worker_proc, _worker_info
     if _worker_proc and _worker_proc.poll() is None:
         try:
-            _worker_proc.terminate()
+            _signal_worker_group(_worker_proc, hard=False)
             _worker_proc.wait(timeout=10)
         except subprocess.TimeoutExpired:
-            _worker_proc.kill()
+            try:
+                _signal_worker_group(_worker_proc, hard=True)
+            except Exception:
+                _worker_proc.kill()
         except Exception as e:
             _log_tail_append(f"[worker:stop] error: {e}\n")
+            try:
+                _worker_proc.kill()
+            except Exception:
+                pass
     _worker_proc = None
     info, _worker_info = _worker_info, None
     _log_tail_append("[worker] stopped\n")
@@ -220,10 +333,17 @@ def _cmd_ok(cmd: list[str]) -> bool:
     except Exception:
         return False
 
-def has_cuda() -> bool:
+def _cmd_present_ok(cmd: list[str]) -> bool:
+    # PATH lookup first: spawning a missing tool costs a full fork+exec just to fail
+    return shutil.which(cmd[0]) is not None and _cmd_ok(cmd)
+
+def _probe_cuda() -> bool:
+    # driver-probe imports stay local so `import ext.worker` stays cheap
+    import ctypes
+
+    # check for the driver library before ever spawning nvidia-smi, so the
+    # common no-CUDA path costs a dlopen instead of a process
     s = platform.system().lower()
-    if _cmd_ok(["nvidia-smi"]):
-        return True
     if s.startswith("win"):
         try:
             ctypes.WinDLL("nvcuda.dll")
@@ -231,25 +351,26 @@ def has_cuda() -> bool:
         except Exception:
             return False
     elif s.startswith("linux"):
-        lib = find_library("cuda") or "/usr/lib/x86_64-linux-gnu/libcuda.so.1"
+        if Path("/usr/lib/x86_64-linux-gnu/libcuda.so.1").exists():
+            return True
         try:
-            if lib and Path(lib).exists():
-                return True
             ctypes.CDLL("libcuda.so.1")
             return True
         except Exception:
-            return False
-    return False
+            pass
+    return _cmd_present_ok(["nvidia-smi"])
 
-def has_rocm() -> bool:
+def _probe_rocm() -> bool:
     s = platform.system().lower()
     if not s.startswith("linux"):
         return False
-    if _cmd_ok(["rocminfo"]):
+    if Path("/opt/rocm").exists():
         return True
-    return Path("/opt/rocm").exists()
+    return _cmd_present_ok(["rocminfo"])
+
+def _probe_vulkan() -> bool:
+    import ctypes
 
-def has_vulkan() -> bool:
     s = platform.system().lower()
     if s.startswith("win"):
         try:
@@ -271,9 +392,51 @@ def has_vulkan() -> bool:
             return False
     return False
 
-def has_metal() -> bool:
+def _probe_metal() -> bool:
     return platform.system().lower().startswith("darwin")
 
+class BackendCaps(NamedTuple):
+    cuda: bool
+    rocm: bool
+    vulkan: bool
+    metal: bool
+
+# one probe pass per process; built on first use so importing this module stays cheap
+_CAPS: Optional[BackendCaps] = None
+
+def _caps() -> BackendCaps:
+    global _CAPS
+    if _CAPS is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # probes spawn nvidia-smi/rocminfo or dlopen drivers; run them side by side
+        # so the first detection costs max() of the probes rather than their sum
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="lm-caps-probe") as ex:
+            fc = ex.submit(_probe_cuda)
+            fr = ex.submit(_probe_rocm)
+            fv = ex.submit(_probe_vulkan)
+            fm = ex.submit(_probe_metal)
+            _CAPS = BackendCaps(
+                cuda=fc.result(),
+                rocm=fr.result(),
+                vulkan=fv.result(),
+                metal=fm.result(),
+            )
+    return _CAPS
+
+def has_cuda() -> bool:
+    return _caps().cuda
+
+def has_rocm() -> bool:
+    return _caps().rocm
+
+def has_vulkan() -> bool:
+    return _caps().vulkan
+
+def has_metal() -> bool:
+    return _caps().metal
+
+@cache
 def _detect_order() -> list[str]:
     osn = current_os()
     if osn == "mac":
@@ -296,6 +459,20 @@ def _detect_order() -> list[str]:
         return order
     return ["cpu"]
 
+def invalidate_backend_cache():
+    """
+    Forget every cached probe and path (OS, driver caps, backend order, venv
+    paths, packaged root, env snapshot); each is rebuilt lazily on next use.
+    Call after a driver install or an env/layout change, and from tests.
+    """
+    global _CAPS
+    _CAPS = None
+    current_os.cache_clear()
+    venv_paths.cache_clear()
+    _detect_order.cache_clear()
+    _internal_root.cache_clear()
+    _env_template.cache_clear()
+
 def preferred_order_or_detect() -> list[str]:
     osn = current_os()
     forced = (os.getenv("LM_FORCE_BACKEND") or "").strip().lower()
@@ -303,7 +480,7 @@ def preferred_order_or_detect() -> list[str]:
         return [forced]
     pref = (SETTINGS.get("runtime", {}).get("preferred_backend") or "").lower()
     allow_fb = SETTINGS.get("runtime", {}).get("allow_fallback", True)
-    detected = _detect_order()
+    detected = list(_detect_order())  # copy: the cached list must not be handed out
     if pref:
         if not allow_fb:
             return [pref]
@@ -325,8 +502,7 @@ def switch_auto(preferred: list[str] | None = None) -> dict:
             out = start_worker(os_name, b)
             try:
                 _, py, _ = venv_paths(os_name, b)
-                ACTIVE_JSON.parent.mkdir(parents=True, exist_ok=True)
-                ACTIVE_JSON.write_text(json.dumps({"python": str(py), "backend": b, "os": os_name}, indent=2))
+                _atomic_write_json(ACTIVE_JSON, {"python": str(py), "backend": b, "os": os_name})
             except Exception:
                 pass
             return {"ok": True, **out}
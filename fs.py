@@ -2,20 +2,10 @@ import os
 import sys
 from typing import Any, cast
 
-# ---- stdout safety (Windows redirects, etc.) ----
-try:
-    out = cast(Any, sys.stdout)
-    if hasattr(out, "reconfigure"):
-        out.reconfigure(encoding="utf-8", errors="replace")
-except Exception:
-    pass
-
-# Root to scan (arg 1) or current directory
-root = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else ".")
-OUTPUT_FILE = os.path.join(root, "my-structure.txt")
+OUTPUT_NAME = "my-structure.txt"
 
 # ---- config ----
-ignore_full = {
+ignore_full = frozenset({
     "target",
     "dist",
     "__pycache__",
@@ -30,110 +20,165 @@ ignore_full = {
     ".pyi_build"
     ".ruff_cache"
     "bind"
-}
-collapse = {".git"}  # show marker only
-expand_two_levels = {".venv"}  # expand .venv two levels (but collapse site-packages)
-expand_one_level = {"node_modules"}  # expand node_modules one level
-expand_full = {"agent", "aimodel"}  # always expand fully
+})
+collapse = frozenset({".git"})  # show marker only
+expand_two_levels = frozenset({".venv"})  # expand .venv two levels (but collapse site-packages)
+expand_one_level = frozenset({"node_modules"})  # expand node_modules one level
+expand_full = frozenset({"agent", "aimodel"})  # always expand fully
+# cheap first-character gate before the ignore_full hash lookup
+_IGNORE_FIRST_CHARS = frozenset(name[0] for name in ignore_full)
 MAX_DEPTH = None  # set to an int (e.g., 6) to hard-cap recursion depth
 
 
-def listdir_safe(path: str) -> list[str]:
-    try:
-        return sorted(os.listdir(path))
-    except (PermissionError, FileNotFoundError):
-        return []
+def _entry_name(e: os.DirEntry[str]) -> str:
+    return e.name
 
 
-def print_line(lines: list[str], depth: int, name: str, is_dir: bool) -> None:
-    indent = "  " * depth
-    lines.append(f"{indent}{name}{'/' if is_dir else ''}")
+def scandir_safe(path: str) -> list[os.DirEntry[str]]:
+    # DirEntry carries the type from the directory read, so no per-entry stat.
+    # Unsorted: callers sort after dropping ignored entries.
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return []
 
 
-def walk(path: str, depth: int = 0, lines: list[str] | None = None) -> list[str]:
-    if lines is None:
-        lines = []
-        print_line(lines, 0, os.path.basename(path.rstrip(os.sep)) or path, True)
+def kept_sorted(path: str) -> list[os.DirEntry[str]]:
+    """Entries of `path` minus ignore_full, sorted by name."""
+    kept = [
+        e for e in scandir_safe(path)
+        if not (e.name[0] in _IGNORE_FIRST_CHARS and e.name in ignore_full)
+    ]
+    kept.sort(key=_entry_name)
+    return kept
 
-    # depth guard
-    if MAX_DEPTH is not None and depth >= MAX_DEPTH:
-        return lines
 
-    entries = listdir_safe(path)
-    dirs: list[str] = []
-    files: list[str] = []
+INDENTS = tuple("  " * i for i in range(64))  # cached indent per depth
 
-    for entry in entries:
-        if entry in ignore_full:
-            continue
-        full = os.path.join(path, entry)
-        (dirs if os.path.isdir(full) else files).append(entry)
 
-    # files first (stable)
-    for f in files:
-        print_line(lines, depth + 1, f, False)
-
-    # then directories
-    for d in dirs:
-        full = os.path.join(path, d)
+def print_line(lines: list[str], depth: int, name: str, is_dir: bool) -> None:
+    indent = INDENTS[depth] if depth < len(INDENTS) else "  " * depth
+    lines.append(indent + name + "/" if is_dir else indent + name)
+
+
+def _mode_for(name: str) -> str:
+    if name in collapse:
+        return "collapse"
+    if name in expand_two_levels:
+        return "two_levels"
+    if name in expand_one_level:
+        return "one_level"
+    # expand_full and everything else recurse normally
+    return "full"
+
+
+def walk(path: str) -> list[str]:
+    lines: list[str] = []
+    # explicit LIFO stack of (dir path, display name, depth of its own line, mode);
+    # no recursion limit on deep trees and no frame setup per directory
+    stack = [(path, os.path.basename(path.rstrip(os.sep)) or path, 0, "full")]
+
+    # hot names bound to locals (LOAD_FAST instead of global/attr lookups per entry)
+    _append = lines.append
+    _print = print_line
+    _kept = kept_sorted
+    _scandir = scandir_safe
+    _push = stack.append
+    _pop = stack.pop
+    _first = _IGNORE_FIRST_CHARS
+    _ignore = ignore_full
+    _indents = INDENTS
+    _n_indents = len(INDENTS)
+
+    while stack:
+        dir_path, name, depth, mode = _pop()
+        _print(lines, depth, name, True)
 
         # collapse heavy dirs completely
-        if d in collapse:
-            print_line(lines, depth + 1, d, True)
+        if mode == "collapse":
             continue
 
         # expand .venv two levels (collapse site-packages)
-        if d in expand_two_levels:
-            print_line(lines, depth + 1, d, True)
-            for child in listdir_safe(full):
-                if child in ignore_full:
-                    continue
-                child_full = os.path.join(full, child)
-                is_child_dir = os.path.isdir(child_full)
-                print_line(lines, depth + 2, child, is_child_dir)
+        if mode == "two_levels":
+            for child in _kept(dir_path):
+                is_child_dir = child.is_dir(follow_symlinks=False)
+                _print(lines, depth + 1, child.name, is_child_dir)
 
                 if not is_child_dir:
                     continue
 
-                for grand in listdir_safe(child_full):
-                    if grand in ignore_full:
-                        continue
-                    grand_full = os.path.join(child_full, grand)
-                    is_grand_dir = os.path.isdir(grand_full)
+                for grand in _kept(child.path):
+                    is_grand_dir = grand.is_dir(follow_symlinks=False)
 
                     # collapse site-packages to a single marker line
-                    if grand == "site-packages" and is_grand_dir:
-                        print_line(lines, depth + 3, "site-packages/ …", True)
+                    if grand.name == "site-packages" and is_grand_dir:
+                        _print(lines, depth + 2, "site-packages/ …", True)
                         continue
 
-                    print_line(lines, depth + 3, grand, is_grand_dir)
+                    _print(lines, depth + 2, grand.name, is_grand_dir)
             continue
 
         # expand node_modules just one level
-        if d in expand_one_level:
-            print_line(lines, depth + 1, d, True)
-            for child in listdir_safe(full):
-                if child in ignore_full:
-                    continue
-                child_full = os.path.join(full, child)
-                print_line(lines, depth + 2, child, os.path.isdir(child_full))
+        if mode == "one_level":
+            for child in _kept(dir_path):
+                _print(lines, depth + 1, child.name, child.is_dir(follow_symlinks=False))
             continue
 
-        # expand agent and aimodel fully (normal recursion)
-        if d in expand_full:
-            print_line(lines, depth + 1, d, True)
-            walk(full, depth + 1, lines)
+        # depth guard
+        if MAX_DEPTH is not None and depth >= MAX_DEPTH:
             continue
 
-        # default recursion
-        print_line(lines, depth + 1, d, True)
-        walk(full, depth + 1, lines)
+        dirs: list[os.DirEntry[str]] = []
+        files: list[os.DirEntry[str]] = []
+
+        for e in _scandir(dir_path):
+            ename = e.name
+            if ename[0] in _first and ename in _ignore:
+                continue
+            (dirs if e.is_dir(follow_symlinks=False) else files).append(e)
+
+        # sort only what survived the ignore filter
+        files.sort(key=_entry_name)
+        dirs.sort(key=_entry_name)
+
+        # files first (stable)
+        child_depth = depth + 1
+        indent = _indents[child_depth] if child_depth < _n_indents else "  " * child_depth
+        for f in files:
+            _append(indent + f.name)
+
+        # then directories, pushed in reverse so they pop in sorted order
+        for e in reversed(dirs):
+            _push((e.path, e.name, child_depth, _mode_for(e.name)))
 
     return lines
 
 
+def write_lines(path: str, lines: list[str]) -> None:
+    # stream lines out instead of building one giant joined string
+    with open(path, "w", encoding="utf-8", newline="\n", buffering=1 << 20) as f:
+        it = iter(lines)
+        f.write(next(it, ""))
+        f.writelines("\n" + line for line in it)
+
+
+def main(argv: list[str]) -> None:
+    # ---- stdout safety (Windows redirects, etc.) ----
+    # done here, not at import, so importing the walker leaves the caller's stdout alone
+    try:
+        out = cast(Any, sys.stdout)
+        if hasattr(out, "reconfigure"):
+            out.reconfigure(encoding="utf-8", errors="replace")
+    except Exception:
+        pass
+
+    # Root to scan (arg 1) or current directory
+    root = os.path.abspath(argv[1] if len(argv) > 1 else ".")
+    output_file = os.path.join(root, OUTPUT_NAME)
+    write_lines(output_file, walk(root))
+    print(f"\n[✓] Saved structure to {output_file}")
+
+
 if __name__ == "__main__":
-    lines = walk(root)
-    with open(OUTPUT_FILE, "w", encoding="utf-8", newline="\n") as f:
-        f.write("\n".join(lines))
-    print(f"\n[✓] Saved structure to {OUTPUT_FILE}")
+    main(sys.argv)
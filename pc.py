@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import argparse
 import os
+import re
 import sys
-from collections.abc import Iterable
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 # at top
 from typing import Any, cast
@@ -19,7 +23,7 @@ except Exception:
 # ──────────────────────────────────────────────────────────────────────────────
 # Chunked output config
 # ──────────────────────────────────────────────────────────────────────────────
-CHUNK_SIZE = 100000
+CHUNK_BYTES = 100_000  # max UTF-8 bytes per output part
 OUTPUT_PREFIX = "clean-structure"  # clean-structure-1.txt, clean-structure-2.txt, ...
 OUTPUT_DIR = "."  # write files here
 
@@ -42,6 +46,10 @@ SEARCH_FOLDERS = ["aimodel/file_read", "frontend/src"]
 # will be printed (helpful to pull in Dockerfiles, envs, etc. anywhere).
 # ──────────────────────────────────────────────────────────────────────────────
 NAME_MATCHES: list[str] = ["env.development", "application.properties", "requirements.txt"]
+# one compiled alternation: a single scan per path instead of one substring scan per match
+_NAME_RE = (
+    re.compile("|".join(re.escape(m.lower()) for m in NAME_MATCHES)) if NAME_MATCHES else None
+)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Discovery rules & filters
@@ -105,19 +113,56 @@ ALLOWED_EXTS = {
 MAX_SIZE_BYTES = 1_000_000  # skip files > 1MB
 
 
-def is_texty(p: Path) -> bool:
-    if not p.is_file():
+def is_texty_entry(entry: os.DirEntry[str]) -> bool:
+    """Name/ext checks first; stat only the files that could be dumped."""
+    name = entry.name
+    if name in IGNORE_BASENAMES:
         return False
-    if p.name in IGNORE_BASENAMES:
+    # same rule as Path.suffix: no suffix for dotfiles or a trailing dot
+    i = name.rfind(".")
+    if not 0 < i < len(name) - 1 or name[i:].lower() not in ALLOWED_EXTS:
         return False
-    if p.suffix.lower() in ALLOWED_EXTS:
+    try:
+        return entry.stat().st_size <= MAX_SIZE_BYTES
+    except OSError:
+        return False
+
+
+def _name_key(e: os.DirEntry[str]) -> str:
+    # Path ordering is case-insensitive on Windows; keep the same order per directory
+    return e.name.lower() if os.name == "nt" else e.name
+
+
+def _iter_tree(root: str) -> Iterator[os.DirEntry[str]]:
+    """
+    Yield the DirEntry of every file under `root`, in the same order as
+    sorted(Path(root).rglob("*")), using one os.scandir per directory.
+    Ignored directories are never opened; symlinked dirs are not descended.
+    """
+    def _sorted_entries(d: str) -> list[os.DirEntry[str]]:
+        try:
+            with os.scandir(d) as it:
+                return sorted(it, key=_name_key)
+        except OSError:
+            return []
+
+    # LIFO stack of entries; children pushed reversed so they pop in sorted order
+    stack = _sorted_entries(root)
+    stack.reverse()
+    while stack:
+        entry = stack.pop()
         try:
-            if p.stat().st_size > MAX_SIZE_BYTES:
-                return False
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORE_DIRS:
+                    children = _sorted_entries(entry.path)
+                    children.reverse()
+                    stack.extend(children)
+                continue
+            if not entry.is_file():
+                continue
         except OSError:
-            return False
-        return True
-    return False
+            continue
+        yield entry
 
 
 def norm_rel(project_root: Path, p: Path) -> str:
@@ -129,62 +174,110 @@ def norm_rel(project_root: Path, p: Path) -> str:
     return rel.as_posix()
 
 
+def _root_skip(root: str) -> int:
+    """Length of the `root` + separator prefix on paths yielded by _iter_tree(root)."""
+    return len(root) if root.endswith(os.sep) else len(root) + 1
+
+
+def _rel_lower(path: str, skip: int) -> str:
+    # same text as norm_rel(...).lower() for paths under the root, without building Path objects
+    rel = path[skip:]
+    if os.sep != "/":
+        rel = rel.replace(os.sep, "/")
+    return rel.lower()
+
+
+# common cp1252/utf-8 mojibake seen in prior dumps
+_MOJIBAKE_MAP = {
+    "ΓÇÖ": "’",
+    "ΓÇ£": "“",
+    "ΓÇ¥": "”",
+    "ΓÇô": "–",
+    "ΓÇö": "—",
+    "ΓÇª": "…",
+    "â€™": "’",
+    "â€œ": "“",
+    "â€�": "”",
+    "â€“": "–",
+    "â€”": "—",
+    "â€¦": "…",
+    # occasional double-encoded forms
+    "Ã¢â‚¬â„¢": "’",
+    "Ã¢â‚¬Å“": "“",
+    "Ã¢â‚¬Â�": "”",
+    "Ã¢â‚¬â€œ": "–",
+    "Ã¢â‚¬â€�": "—",
+    "Ã¢â‚¬Â¦": "…",
+    # stray NBSP marker that sometimes sneaks in
+    "Â ": " ",
+}
+# one alternation, longest keys first so double-encoded forms win over their prefixes
+_MOJIBAKE_RE = re.compile("|".join(re.escape(k) for k in sorted(_MOJIBAKE_MAP, key=len, reverse=True)))
+
+
 def _normalize_output(s: str) -> str:
-    # common cp1252/utf-8 mojibake seen in prior dumps
-    repl = {
-        "ΓÇÖ": "’",
-        "ΓÇ£": "“",
-        "ΓÇ¥": "”",
-        "ΓÇô": "–",
-        "ΓÇö": "—",
-        "ΓÇª": "…",
-        "â€™": "’",
-        "â€œ": "“",
-        "â€�": "”",
-        "â€“": "–",
-        "â€”": "—",
-        "â€¦": "…",
-        # occasional double-encoded forms
-        "Ã¢â‚¬â„¢": "’",
-        "Ã¢â‚¬Å“": "“",
-        "Ã¢â‚¬Â�": "”",
-        "Ã¢â‚¬â€œ": "–",
-        "Ã¢â‚¬â€�": "—",
-        "Ã¢â‚¬Â¦": "…",
-        # stray NBSP marker that sometimes sneaks in
-        "Â ": " ",
-    }
-    for k, v in repl.items():
-        s = s.replace(k, v)
-    return s
-
-
-def dump_one(project_root: Path, p: Path, printed: set[str], out_parts: list[str]) -> None:
-    """Append file header + contents to out_parts (no printing)."""
-    rel = norm_rel(project_root, p)
-    if rel in printed:
-        return
-    printed.add(rel)
+    # single linear scan instead of one full str.replace pass per key
+    return _MOJIBAKE_RE.sub(lambda m: _MOJIBAKE_MAP[m.group(0)], s)
+
 
+def _encode(s: str) -> bytes:
+    # the parts are written in binary mode; keep the platform newlines text mode gave us
+    if os.linesep != "\n":
+        s = s.replace("\n", os.linesep)
+    return s.encode("utf-8")
+
+
+def _read_and_normalize(rel: str, p: Path) -> list[bytes]:
+    """Read + decode + normalize + encode one file into its output fragments (thread-safe)."""
     header = f"\n# ===== {rel} =====\n\n"
+    try:
+        data = p.read_bytes()
+    except OSError as e:
+        return [_encode(f"{header}⚠️ Could not read {rel}: {e}\n")]
     try:
         # try UTF-8 first
-        text = p.read_text(encoding="utf-8")
+        text = data.decode("utf-8")
     except UnicodeDecodeError:
-        # fallback to Windows cp1252 if it's not UTF-8
-        try:
-            text = p.read_text(encoding="cp1252")
-        except Exception as e:
-            out_parts.append(f"{header}⚠️ Could not read {rel}: {e}\n")
-            return
-    except Exception as e:
-        out_parts.append(f"{header}⚠️ Could not read {rel}: {e}\n")
-        return
-
-    out_parts.append(header)
-    out_parts.append(_normalize_output(text))
+        # fallback to Windows cp1252 if it's not UTF-8 (decoded in memory, no re-read)
+        text = data.decode("cp1252", errors="replace")
+    if "\r" in text:
+        # match read_text()'s universal-newline translation
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    parts = [_encode(header), _encode(_normalize_output(text))]
     if not text.endswith("\n"):
-        out_parts.append("\n")  # ensure trailing newline for clean separation
+        parts.append(_encode("\n"))  # ensure trailing newline for clean separation
+    return parts
+
+
+def _claim(project_root: Path, p: Path, printed: set[str]) -> str | None:
+    """Header path for `p`, or None if it was already dumped (records it in `printed`)."""
+    rel = norm_rel(project_root, p)
+    if rel in printed:
+        return None
+    printed.add(rel)
+    return rel
+
+
+def dump_all(project_root: Path, paths: Iterable[Path], printed: set[str]) -> Iterator[bytes]:
+    """
+    Yield header + contents of each not-yet-printed file in `paths` as encoded
+    output fragments. Reads run on a thread pool so file I/O latency overlaps;
+    output order is unchanged, and only a bounded window of files is in flight
+    so memory stays flat on big trees.
+    """
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    window: deque[Future[list[bytes]]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for p in paths:
+            rel = _claim(project_root, p, printed)
+            if rel is None:
+                continue
+            window.append(ex.submit(_read_and_normalize, rel, p))
+            if len(window) >= workers * 2:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
 
 
 def walk_selected_folders(project_root: Path) -> Iterable[Path]:
@@ -193,31 +286,60 @@ def walk_selected_folders(project_root: Path) -> Iterable[Path]:
         base = (project_root / folder).resolve()
         if not base.exists() or not base.is_dir():
             continue
-        for p in sorted(base.rglob("*")):
-            if any(seg in IGNORE_DIRS for seg in p.parts):
-                continue
-            if is_texty(p):
-                yield p
+        for entry in _iter_tree(str(base)):
+            if is_texty_entry(entry):
+                yield Path(entry.path)
 
 
 def walk_name_matches(project_root: Path) -> Iterable[Path]:
     """Yield text-like files anywhere whose RELATIVE PATH contains a NAME_MATCHES item."""
-    if not NAME_MATCHES:
+    if _NAME_RE is None:
         return []
-    lowers = [m.lower() for m in NAME_MATCHES]
-    for p in sorted(project_root.rglob("*")):
-        if any(seg in IGNORE_DIRS for seg in p.parts):
+    root = str(project_root)
+    skip = _root_skip(root)
+    for entry in _iter_tree(root):
+        if not is_texty_entry(entry):
             continue
-        if not is_texty(p):
+        path = entry.path
+        if _NAME_RE.search(_rel_lower(path, skip)):
+            yield Path(path)
+
+
+def walk_both(project_root: Path) -> Iterable[Path]:
+    """
+    --both in a single pass over the project root. Files are bucketed per
+    SEARCH_FOLDERS entry and for NAME_MATCHES as the walk goes, then yielded
+    in the same order as walk_selected_folders() followed by walk_name_matches().
+    """
+    prefixes: list[str] = []
+    for folder in SEARCH_FOLDERS:
+        base = project_root / folder
+        if not base.is_dir():
             continue
-        rel_lower = norm_rel(project_root, p).lower()
-        if any(m in rel_lower for m in lowers):
-            yield p
+        if base.resolve() != base or any(part in IGNORE_DIRS for part in Path(folder).parts):
+            # symlinked/odd or pruned folder: the root walk can't see it the same way
+            return chain(walk_selected_folders(project_root), walk_name_matches(project_root))
+        prefixes.append(str(base) + os.sep)
+
+    root = str(project_root)
+    skip = _root_skip(root)
+    buckets: list[list[str]] = [[] for _ in prefixes]
+    matches: list[str] = []
+    for entry in _iter_tree(root):
+        if not is_texty_entry(entry):
+            continue
+        path = entry.path
+        for bucket, prefix in zip(buckets, prefixes, strict=True):
+            if path.startswith(prefix):
+                bucket.append(path)
+        if _NAME_RE is not None and _NAME_RE.search(_rel_lower(path, skip)):
+            matches.append(path)
+    return map(Path, chain(*buckets, matches))
 
 
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(
-        description="Dump project files under selected folders (and/or name matches) into 3,000-char chunked files."
+        description="Dump project files under selected folders (and/or name matches) into size-capped chunked files."
     )
     g = ap.add_mutually_exclusive_group()
     g.add_argument(
@@ -232,58 +354,79 @@ def parse_args() -> argparse.Namespace:
     return ap.parse_args()
 
 
-def write_chunked(text: str, chunk_size: int, prefix: str, out_dir: str) -> list[Path]:
+def write_chunked_stream(
+    fragments: Iterable[bytes], chunk_bytes: int, prefix: str, out_dir: str
+) -> tuple[list[Path], int]:
     """
-    Write `text` into sequential files of up to `chunk_size` characters each.
-    Produces <prefix>-1.txt, <prefix>-2.txt, ...
+    Stream already-encoded `fragments` into sequential files of up to
+    `chunk_bytes` bytes each, never splitting a UTF-8 sequence.
+    Produces <prefix>-1.txt, <prefix>-2.txt, ... without ever holding the whole
+    dump in memory. Returns (files written, total bytes).
     """
     out_dir_path = Path(out_dir).resolve()
     out_dir_path.mkdir(parents=True, exist_ok=True)
 
     written: list[Path] = []
-    if not text:
-        return written
-
-    for i in range(0, len(text), chunk_size):
-        part = text[i : i + chunk_size]
-        out_path = out_dir_path / f"{prefix}-{(i // chunk_size) + 1}.txt"
-        out_path.write_text(part, encoding="utf-8")
-        written.append(out_path)
-
-    return written
+    total = 0
+    fp = None
+    room = 0  # bytes left in the current part
+    try:
+        for frag in fragments:
+            n = len(frag)
+            total += n
+            view = memoryview(frag)
+            pos = 0
+            while pos < n:
+                if room == 0:
+                    if fp is not None:
+                        fp.close()
+                    out_path = out_dir_path / f"{prefix}-{len(written) + 1}.txt"
+                    fp = out_path.open("wb")
+                    written.append(out_path)
+                    room = chunk_bytes
+                end = pos + room
+                if end < n:
+                    # back up to a lead byte so no character straddles two parts
+                    while end > pos and (frag[end] & 0xC0) == 0x80:
+                        end -= 1
+                    if end == pos:
+                        room = 0  # next character doesn't fit; roll to a new part
+                        continue
+                else:
+                    end = n
+                fp.write(view[pos:end])
+                room -= end - pos
+                pos = end
+    finally:
+        if fp is not None:
+            fp.close()
+
+    return written, total
 
 
 def main() -> None:
     args = parse_args()
     project_root = Path(__file__).resolve().parent
     printed: set[str] = set()
-    out_parts: list[str] = []
 
-    # Build the output in memory (headers + file contents)
     if args.matches:
-        for p in walk_name_matches(project_root):
-            dump_one(project_root, p, printed, out_parts)
+        paths: Iterable[Path] = walk_name_matches(project_root)
     elif args.both:
-        for p in walk_selected_folders(project_root):
-            dump_one(project_root, p, printed, out_parts)
-        for p in walk_name_matches(project_root):
-            dump_one(project_root, p, printed, out_parts)
+        paths = walk_both(project_root)
     else:
-        for p in walk_selected_folders(project_root):
-            dump_one(project_root, p, printed, out_parts)
-
-    combined = "".join(out_parts)
+        paths = walk_selected_folders(project_root)
 
-    # Write chunked files
-    written = write_chunked(
-        text=combined,
-        chunk_size=CHUNK_SIZE,
+    # Headers + file contents, streamed straight into the chunked files
+    fragments = dump_all(project_root, paths, printed)
+    written, total_bytes = write_chunked_stream(
+        fragments,
+        chunk_bytes=CHUNK_BYTES,
         prefix=OUTPUT_PREFIX,
         out_dir=OUTPUT_DIR,
     )
 
     # Short summary
-    print(f"✅ Total characters: {len(combined)}")
+    print(f"✅ Total bytes: {total_bytes}")
     print(f"✅ Files written: {len(written)}")
     for p in written:
         print(f" - {p}")
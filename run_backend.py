@@ -1,14 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures as cf
 import contextlib
+import errno
+import faulthandler
+import functools
+import importlib.util
+import inspect
+import itertools
 import json
+import logging
 import os
 import pathlib
 import random
+import re
 import socket
+import stat
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import traceback
 from importlib import import_module
+from multiprocessing.util import log_to_stderr
+from typing import Annotated, get_args, get_origin
 
 import uvicorn
 import multiprocessing as mp
@@ -45,34 +62,70 @@ if IS_WIN:
     except Exception:
         pass
 
+# boot/diag output goes through one logger with its own stdout handler; it doesn't propagate,
+# so the app's setup_logging() (which restyles root's handler) leaves these lines as they are.
+# LM_LOG_LEVEL=WARNING silences the boot chatter.
+log = logging.getLogger("localmind.boot")
+if not log.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.propagate = False
+log.setLevel(getattr(logging, os.getenv("LM_LOG_LEVEL", "INFO").upper(), logging.INFO))
+
 def _log_preamble():
-    print("[boot] python:", sys.executable, flush=True)
-    print(f"[boot] pid={PID} ppid={PPID} frozen={IS_FROZEN}", flush=True)
-    print(f"[boot] mp.start_method(before)={_safe_get_start_method()}  forced={_forced_start_method}", flush=True)
+    log.info("[boot] python: %s", sys.executable)
+    log.info("[boot] pid=%s ppid=%s frozen=%s", PID, PPID, IS_FROZEN)
+    log.info("[boot] mp.start_method(before)=%s  forced=%s", _safe_get_start_method(), _forced_start_method)
 
 _log_preamble()
 
-def _where():
-    import traceback as _tb
-    return "".join(_tb.format_stack(limit=16))
+# LM_DIAG_LEVEL=verbose adds the hot-path hooks (create_task, Popen, DataLoader) and full stacks;
+# the default level logs only the caller's file:line, which is far cheaper than formatting a stack
+_DIAG_VERBOSE = os.getenv("LM_DIAG_LEVEL", "basic").lower() == "verbose"
+_LOG_STACKS = _DIAG_VERBOSE
+
+def _log_caller(tag: str, caller=None) -> None:
+    if caller is None:
+        caller = sys._getframe(2)  # 0 = here, 1 = the hook, 2 = whoever called the hooked API
+    if _LOG_STACKS:
+        log.info("[%s] caller stack (tail):\n%s", tag, "".join(traceback.format_stack(caller, limit=16)))
+    else:
+        log.info("[%s] caller %s:%s", tag, caller.f_code.co_filename, caller.f_lineno)
+
+_TASK_DIAG = False
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+def _logging_task_factory(loop, coro, **kw):
+    task = asyncio.Task(coro, loop=loop, **kw)
+    log.info("[asyncio.task] %s", getattr(coro, "__qualname__", coro))
+    caller = sys._getframe(1)
+    while caller is not None and caller.f_code.co_filename.startswith(_ASYNCIO_DIR):
+        caller = caller.f_back  # skip asyncio's own create_task frames
+    _log_caller("asyncio.task", caller)
+    return task
 
-def _enable_spawn_diagnostics():
+def install_task_diagnostics(app):
+    # the serving loop only exists once uvicorn runs, so hook it from startup
+    @app.on_event("startup")
+    async def _task_diag():
+        asyncio.get_running_loop().set_task_factory(_logging_task_factory)
+        log.info("[diag] asyncio task factory installed")
+
+def _enable_spawn_diag_basic():
     try:
-        import faulthandler, signal
         faulthandler.enable(all_threads=True)
-        print("[diag] faulthandler enabled", flush=True)
+        log.info("[diag] faulthandler enabled")
     except Exception as _e:
-        print("[diag] faulthandler enable failed:", _e, flush=True)
+        log.warning("[diag] faulthandler enable failed: %s", _e)
 
     try:
-        from multiprocessing.util import log_to_stderr
         _mp_logger = log_to_stderr()
         level = os.getenv("LM_MP_LOG_LEVEL", "INFO")
-        import logging as _logging
-        _mp_logger.setLevel(getattr(_logging, str(level).upper(), _logging.INFO))
-        print(f"[diag] mp logger enabled level={_mp_logger.level}", flush=True)
+        _mp_logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        log.info("[diag] mp logger enabled level=%s", _mp_logger.level)
     except Exception as _e:
-        print("[diag] mp logger setup failed:", _e, flush=True)
+        log.warning("[diag] mp logger setup failed: %s", _e)
 
     try:
         _OrigProcess = mp.Process
@@ -81,92 +134,92 @@ def _enable_spawn_diagnostics():
                 tgt = kw.get("target")
                 name = getattr(tgt, "__name__", None) if tgt else None
                 mod  = getattr(tgt, "__module__", None) if tgt else None
-                print(f"[mp.Process] spawn requested target={mod}.{name} args={len(a)} kwargs={list(kw.keys())}", flush=True)
-                print("[mp.Process] caller stack (tail):\n" + _where(), flush=True)
+                log.info("[mp.Process] spawn requested target=%s.%s args=%d kwargs=%s", mod, name, len(a), list(kw))
+                _log_caller("mp.Process")
                 super().__init__(*a, **kw)
         mp.Process = _LoggingProcess
-        print("[diag] hooked multiprocessing.Process", flush=True)
+        log.info("[diag] hooked multiprocessing.Process")
     except Exception as _e:
-        print("[diag] hook mp.Process failed:", _e, flush=True)
+        log.warning("[diag] hook mp.Process failed: %s", _e)
 
     try:
-        import concurrent.futures as cf
         _OrigPPE = cf.ProcessPoolExecutor
         class _LoggingPPE(_OrigPPE):
             def __init__(self, *a, **kw):
                 mw = kw.get("max_workers", (a[0] if a else None))
-                print(f"[ProcessPoolExecutor] created max_workers={mw}", flush=True)
-                print("[ProcessPoolExecutor] caller stack (tail):\n" + _where(), flush=True)
+                log.info("[ProcessPoolExecutor] created max_workers=%s", mw)
+                _log_caller("ProcessPoolExecutor")
                 super().__init__(*a, **kw)
         cf.ProcessPoolExecutor = _LoggingPPE
-        print("[diag] hooked concurrent.futures.ProcessPoolExecutor", flush=True)
+        log.info("[diag] hooked concurrent.futures.ProcessPoolExecutor")
     except Exception as _e:
-        print("[diag] hook ProcessPoolExecutor failed:", _e, flush=True)
+        log.warning("[diag] hook ProcessPoolExecutor failed: %s", _e)
 
+def _enable_spawn_diag_verbose():
     try:
-        import subprocess as _subp
-        _OrigPopen = _subp.Popen
+        _OrigPopen = subprocess.Popen
         def _LoggingPopen(*a, **kw):
             try:
                 cmd = a[0] if a else kw.get("args")
             except Exception:
                 cmd = "<unknown>"
-            print(f"[subprocess.Popen] args={cmd}", flush=True)
-            print("[subprocess.Popen] caller stack (tail):\n" + _where(), flush=True)
+            log.info("[subprocess.Popen] args=%s", cmd)
+            _log_caller("subprocess.Popen")
             return _OrigPopen(*a, **kw)
-        _subp.Popen = _LoggingPopen
-        print("[diag] hooked subprocess.Popen", flush=True)
+        subprocess.Popen = _LoggingPopen
+        log.info("[diag] hooked subprocess.Popen")
     except Exception as _e:
-        print("[diag] hook subprocess.Popen failed:", _e, flush=True)
+        log.warning("[diag] hook subprocess.Popen failed: %s", _e)
 
-    try:
-        import asyncio as _asyncio
-        _OrigCreateTask = _asyncio.create_task
-        def _LoggingCreateTask(coro, *a, **kw):
-            print(f"[asyncio.create_task] {getattr(coro, '__name__', str(coro))}", flush=True)
-            print("[asyncio.create_task] caller stack (tail):\n" + _where(), flush=True)
-            return _OrigCreateTask(coro, *a, **kw)
-        _asyncio.create_task = _LoggingCreateTask
-        print("[diag] hooked asyncio.create_task", flush=True)
-    except Exception as _e:
-        print("[diag] hook asyncio.create_task failed:", _e, flush=True)
+    # tasks are logged through the server loop's task factory (see install_task_diagnostics)
+    # instead of patching asyncio.create_task, which misses loop.create_task callers
+    global _TASK_DIAG
+    _TASK_DIAG = True
 
-    if os.getenv("LM_DIAG_TORCH", "1") != "0":
+    if os.getenv("LM_DIAG_TORCH", "1") == "0":
+        return
+    # importing torch costs seconds (CUDA/cuDNN init); only do it when explicitly asked
+    if os.getenv("LM_DIAG_TORCH_IMPORT") != "1":
+        present = importlib.util.find_spec("torch") is not None
+        log.info("[torch] module %s", "present (not imported; LM_DIAG_TORCH_IMPORT=1 to hook)" if present else "not installed")
+        return
+    try:
+        import torch
+        log.info("[torch] present version=%s", getattr(torch, "__version__", "?"))
         try:
-            import torch
-            print(f"[torch] present version={getattr(torch, '__version__', '?')}", flush=True)
-            try:
-                from torch.utils.data import DataLoader as _TorchDL
-                class _LoggingDL(_TorchDL):
-                    def __init__(self, *a, **kw):
-                        nw = kw.get("num_workers", 0)
-                        print(f"[torch.DataLoader] num_workers={nw}", flush=True)
-                        print("[torch.DataLoader] caller stack (tail):\n" + _where(), flush=True)
-                        super().__init__(*a, **kw)
-                import torch.utils.data as tud
-                tud.DataLoader = _LoggingDL
-                print("[diag] hooked torch.utils.data.DataLoader", flush=True)
-            except Exception as _e:
-                print("[diag] torch DataLoader hook failed:", _e, flush=True)
-            try:
-                import torch.multiprocessing as tmp
-                print(f"[torch.multiprocessing] start_method(mp)={mp.get_start_method(allow_none=True)}", flush=True)
-            except Exception as _e:
-                print("[diag] torch.multiprocessing import failed:", _e, flush=True)
+            from torch.utils.data import DataLoader as _TorchDL
+            class _LoggingDL(_TorchDL):
+                def __init__(self, *a, **kw):
+                    nw = kw.get("num_workers", 0)
+                    log.info("[torch.DataLoader] num_workers=%s", nw)
+                    _log_caller("torch.DataLoader")
+                    super().__init__(*a, **kw)
+            import torch.utils.data as tud
+            tud.DataLoader = _LoggingDL
+            log.info("[diag] hooked torch.utils.data.DataLoader")
         except Exception as _e:
-            print("[diag] torch not present / import failed:", _e, flush=True)
+            log.warning("[diag] torch DataLoader hook failed: %s", _e)
+        try:
+            import torch.multiprocessing as tmp
+            log.info("[torch.multiprocessing] start_method(mp)=%s", mp.get_start_method(allow_none=True))
+        except Exception as _e:
+            log.warning("[diag] torch.multiprocessing import failed: %s", _e)
+    except Exception as _e:
+        log.warning("[diag] torch not present / import failed: %s", _e)
 
 if os.getenv("LM_DIAG_SPAWN", "0") in ("1", "true", "TRUE", "yes", "on"):
-    _enable_spawn_diagnostics()
-    print("[diag] SPAWN DIAGNOSTICS ENABLED", flush=True)
+    _enable_spawn_diag_basic()
+    if _DIAG_VERBOSE:
+        _enable_spawn_diag_verbose()
+    log.info("[diag] SPAWN DIAGNOSTICS ENABLED level=%s", "verbose" if _DIAG_VERBOSE else "basic")
 else:
-    print("[diag] spawn diagnostics disabled (LM_DIAG_SPAWN not set)", flush=True)
+    log.info("[diag] spawn diagnostics disabled (LM_DIAG_SPAWN not set)")
 
 PREF_API = (8001, 5321)
 API_RANGE = (10240, 11240)
 BIND_HOST = "0.0.0.0"
 
-print("[data] LOCALMIND_DATA_DIR =", os.getenv("LOCALMIND_DATA_DIR"))
+log.info("[data] LOCALMIND_DATA_DIR = %s", os.getenv("LOCALMIND_DATA_DIR"))
 
 try:
     import platformdirs
@@ -185,171 +238,307 @@ RUNTIME_DIR = DATA_ROOT / ".runtime"
 RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
 PORTS_PATH = RUNTIME_DIR / "ports.json"
 HEALTH_PATH = RUNTIME_DIR / "health.json"
+HEALTH_WRITE_INTERVAL = 30.0  # seconds between health.json rewrites from /health
 
-def _free(p: int) -> bool:
-    with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        try:
-            s.bind((BIND_HOST, p))
-            return True
-        except OSError:
-            return False
+RANDOM_TRIES = 128  # 128 taken random ports in a row is effectively impossible
+
+_BIND_BUSY = frozenset({errno.EADDRINUSE, errno.EACCES, getattr(errno, "WSAEACCES", errno.EACCES)})
+
+def _random_ports(lo: int, hi: int, limit: int):
+    # draw without replacement lazily; nothing is preallocated if an early port is free
+    seen: set[int] = set()
+    n = min(limit, hi - lo)
+    while len(seen) < n:
+        p = random.randrange(lo, hi)
+        if p not in seen:
+            seen.add(p)
+            yield p
 
 def choose_port() -> int:
-    print(f"[boot] choose_port prefer={PREF_API} fallback_range={API_RANGE}", flush=True)
-    for p in PREF_API:
-        if _free(p):
-            print(f"[boot] choose_port -> picked preferred {p}", flush=True)
-            return p
-        else:
-            print(f"[boot] choose_port -> preferred {p} in use", flush=True)
+    log.info("[boot] choose_port prefer=%s fallback_range=%s", PREF_API, API_RANGE)
     lo, hi = API_RANGE
-    for p in random.sample(range(lo, hi), min(900, max(1, hi - lo))):
-        if _free(p):
-            print(f"[boot] choose_port -> picked random {p}", flush=True)
+    with contextlib.closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        # same bind semantics uvicorn uses, so TIME_WAIT ports aren't treated as taken
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # a failed bind leaves the socket unbound, so the same socket serves every try;
+        # port 0 last: let the kernel pick an ephemeral port
+        candidates = itertools.chain(PREF_API, _random_ports(lo, hi, RANDOM_TRIES), (0,))
+        for i, p in enumerate(candidates):
+            preferred = i < len(PREF_API)
+            try:
+                s.bind((BIND_HOST, p))
+            except OSError as e:
+                if e.errno not in _BIND_BUSY:
+                    raise
+                if preferred:
+                    log.info("[boot] choose_port -> preferred %s in use", p)
+                continue
+            if preferred:
+                log.info("[boot] choose_port -> picked preferred %s", p)
+            elif p:
+                log.info("[boot] choose_port -> picked random %s", p)
+            else:
+                p = s.getsockname()[1]
+                log.info("[boot] choose_port -> picked ephemeral %s", p)
             return p
     raise RuntimeError("No free port found")
 
-def lan_ip() -> str:
+def _udp_route_ip() -> str | None:
+    # connect() on UDP sends nothing; it only asks the routing table which local address is used
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
+        return s.getsockname()[0]
     except Exception:
-        ip = "127.0.0.1"
+        return None
     finally:
+        s.close()
+
+@functools.lru_cache(maxsize=1)
+def lan_ip() -> str:
+    candidates = []
+    try:
+        import psutil  # type: ignore
+        stats = psutil.net_if_stats()
+        for name, addrs in psutil.net_if_addrs().items():
+            if name in stats and not stats[name].isup:
+                continue
+            for a in addrs:
+                if a.family == socket.AF_INET and not a.address.startswith(("127.", "169.254.")):
+                    candidates.append(a.address)
+    except Exception:
+        pass
+    if len(candidates) == 1:
+        return candidates[0]  # unambiguous: no need to consult routing
+    # several interfaces (VPN, docker, ...) or no psutil: let the default route decide
+    return _udp_route_ip() or (candidates[0] if candidates else "127.0.0.1")
+
+# mkstemp creates 0600 files; read the umask once so replaced files keep the usual mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _atomic_write_bytes(path: pathlib.Path, data: bytes) -> bool:
+    """
+    Temp file in the same dir + os.replace, so readers never see a torn file.
+    Skips the write when the file already holds exactly `data`; returns whether it wrote.
+    """
+    try:
+        if path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
         try:
-            s.close()
-        except Exception:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except OSError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
             pass
-    return ip
+        raise
+    return True
+
+def _write_health(data: bytes) -> None:
+    try:
+        _atomic_write_bytes(HEALTH_PATH, data)
+    except Exception:
+        pass
+
+def _info_body(ip: str, port: int) -> bytes:
+    # same bytes FastAPI's JSONResponse would render for this dict
+    info = {"ip": ip, "port": port, "url": f"http://{ip}:{port}", "pid": PID, "frozen": IS_FROZEN}
+    return json.dumps(info, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 def ensure_health(app):
-    from fastapi import APIRouter, Request
+    from fastapi import APIRouter, Request, Response
     r = APIRouter()
+    health_bytes = json.dumps({"ok": True, "pid": PID}).encode("utf-8")
+    last_write = float("-inf")
     @r.get("/health")
     async def _health():
-        try:
-            HEALTH_PATH.write_text(json.dumps({"ok": True, "pid": PID}), encoding="utf-8")
-        except Exception:
-            pass
+        # pollers hit this every second; refresh the file at most every HEALTH_WRITE_INTERVAL,
+        # and off the event loop thread
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= HEALTH_WRITE_INTERVAL:
+            last_write = now
+            asyncio.get_running_loop().run_in_executor(None, _write_health, health_bytes)
         return {"ok": True, "pid": PID}
     @r.get("/healthz")
     async def _healthz():
         return {"ok": True, "pid": PID}
     @r.get("/info")
     async def _info(request: Request):
-        ip = getattr(request.app.state, "lan_ip", "127.0.0.1")
-        port = int(getattr(request.app.state, "port", 8001))
-        return {"ip": ip, "port": port, "url": f"http://{ip}:{port}", "pid": PID, "frozen": IS_FROZEN}
+        # port/IP don't change after boot: serve the pre-serialized body
+        state = request.app.state
+        body = getattr(state, "info_body", None)
+        if body is None:
+            body = state.info_body = _info_body(
+                getattr(state, "lan_ip", "127.0.0.1"), int(getattr(state, "port", 8001))
+            )
+        return Response(content=body, media_type="application/json")
     app.include_router(r)
 
+# paths that must 404 as JSON instead of falling back to the SPA (whole first segment only)
+_API_RX = re.compile(r"^/(?:openapi\.json|docs|redoc|api|metrics|health|info)(?:/|$)")
+
 def mount_frontend(app):
     from pathlib import Path
     from fastapi import Request
     from fastapi.responses import FileResponse, JSONResponse
     from fastapi.staticfiles import StaticFiles
     dist = Path(__file__).resolve().parent / "frontend" / "dist"
-    print(f"[boot] frontend dist exists={dist.exists()} at={dist}", flush=True)
+    log.info("[boot] frontend dist exists=%s at=%s", dist.exists(), dist)
     if dist.exists():
         app.mount("/", StaticFiles(directory=str(dist), html=True), name="frontend")
+        index_file = dist / "index.html"
         @app.exception_handler(404)
         async def spa_fallback(request: Request, exc):
             p = request.url.path
             accept = request.headers.get("accept", "")
-            if p.startswith(("/openapi.json", "/docs", "/docs/oauth2-redirect", "/redoc", "/api", "/metrics", "/health", "/info")):
+            if _API_RX.match(p):
                 return JSONResponse({"detail": "Not Found"}, status_code=404)
             if "application/json" in accept or p.endswith(".json"):
                 return JSONResponse({"detail": "Not Found"}, status_code=404)
-            return FileResponse(dist / "index.html")
+            return FileResponse(index_file)
+
+@functools.cache
+def _sig(fn):
+    return inspect.signature(fn)
 
 def preflight_openapi_or_point_to_offender(app):
-    import inspect
-    from typing import Annotated, get_args, get_origin
     from fastapi import Request as _Req
-    from fastapi.params import Body, Cookie, File, Form, Header, Param, Path, Query
+    _empty = inspect.Parameter.empty
     def _bad_request_param(p: inspect.Parameter) -> bool:
         ann = p.annotation
-        inner = get_args(ann)[0] if get_origin(ann) is Annotated else ann
-        if inner is not _Req:
-            return False
-        return (
-            isinstance(p.default, (Param, Query, Body, Path, Header, Cookie, File, Form))
-            or p.default is not inspect._empty
-        )
+        if ann is not _Req:
+            # only unwrap Annotated[...] when that's what it is
+            if get_origin(ann) is not Annotated or get_args(ann)[0] is not _Req:
+                return False
+        # any default on a Request param breaks OpenAPI; Query()/Body()/... instances are
+        # defaults too, so no isinstance() over the fastapi.params classes is needed
+        return p.default is not _empty
     routes = getattr(app, "routes", [])
-    print("[preflight] routes present:", len(routes))
-    for r in routes:
-        fn = getattr(r, "endpoint", None)
-        print("  -", r.path, "->", getattr(fn, "__module__", "?") + "." + getattr(fn, "__name__", "?"))
+    log.info("[preflight] routes present: %d", len(routes))
+    if os.getenv("LOCALMIND_PREFLIGHT_VERBOSE") and routes:
+        # one endpoint lookup per route, one write for the whole listing
+        lines = [
+            f"  - {r.path} -> {getattr(fn, '__module__', '?')}.{getattr(fn, '__name__', '?')}"
+            for r in routes
+            for fn in (getattr(r, "endpoint", None),)
+        ]
+        log.info("%s", "\n".join(lines))
     try:
-        app.openapi_schema = None
+        # no cache reset: this warms the same cached schema the readiness probe reads
         app.openapi()
-        print("[preflight] OpenAPI OK")
+        log.info("[preflight] OpenAPI OK")
         return
     except Exception as e:
-        print("[preflight] OpenAPI FAILED:", repr(e))
-    print("[preflight] scanning endpoints for illegal Request params…")
+        log.warning("[preflight] OpenAPI FAILED: %r", e)
+    log.info("[preflight] scanning endpoints for illegal Request params…")
     offenders = []
     for r in routes:
         fn = getattr(r, "endpoint", None)
         if not callable(fn):
             continue
         try:
-            sig = inspect.signature(fn)
+            sig = _sig(fn)
         except Exception:
             continue
         bads = [p for p in sig.parameters.values() if _bad_request_param(p)]
         if bads:
             offenders.append((r.path, fn.__module__, getattr(fn, "__name__", "<fn>"), str(sig)))
     if offenders:
-        print("=== OFFENDERS (fix these) ===")
-        for path, mod, name, sig in offenders:
-            print(f" {path} -> {mod}.{name} {sig}")
-        print("=============================")
+        log.warning("=== OFFENDERS (fix these) ===\n%s\n=============================",
+                    "\n".join(f" {path} -> {mod}.{name} {sig}" for path, mod, name, sig in offenders))
     else:
-        print("[preflight] no obvious offenders found; the error may be in a composed dependency")
+        log.info("[preflight] no obvious offenders found; the error may be in a composed dependency")
+
+def _uvicorn_impl() -> dict:
+    # C event loop / HTTP parser when available; uvloop has no Windows build
+    impl = {}
+    if not IS_WIN:
+        try:
+            import uvloop  # noqa: F401
+            impl["loop"] = "uvloop"
+        except ImportError:
+            pass
+    try:
+        import httptools  # noqa: F401
+        impl["http"] = "httptools"
+    except ImportError:
+        pass
+    return impl
+
+def schedule_preflight(app):
+    # schema generation can take a while on a big app; run it once serving has started,
+    # in a daemon thread and not awaited, so neither boot nor startup waits on it
+    @app.on_event("startup")
+    async def _preflight():
+        threading.Thread(
+            target=preflight_openapi_or_point_to_offender, args=(app,),
+            name="openapi-preflight", daemon=True,
+        ).start()
 
 if __name__ == "__main__":
     try:
         freeze_support()
-        print(f"[mp] freeze_support() OK  start_method(now)={_safe_get_start_method()}", flush=True)
+        log.info("[mp] freeze_support() OK  start_method(now)=%s", _safe_get_start_method())
     except Exception as e:
-        print(f"[mp] freeze_support() error: {e}", flush=True)
+        log.warning("[mp] freeze_support() error: %s", e)
     try:
         proc = mp.current_process()
-        print(f"[mp] current_process name={proc.name} pid={proc.pid}", flush=True)
+        log.info("[mp] current_process name=%s pid=%s", proc.name, proc.pid)
     except Exception:
         pass
     try:
-        print("[boot] choose_port", flush=True)
+        log.info("[boot] choose_port")
         PORT = choose_port()
         try:
-            PORTS_PATH.write_text(json.dumps({"api_port": PORT}), encoding="utf-8")
-            print(f"[boot] wrote {PORTS_PATH} -> {{'api_port': {PORT}}}", flush=True)
+            wrote = _atomic_write_bytes(PORTS_PATH, json.dumps({"api_port": PORT}).encode("utf-8"))
+            log.info("[boot] %s %s -> {'api_port': %s}", "wrote" if wrote else "unchanged", PORTS_PATH, PORT)
         except Exception as e:
-            print(f"[boot] failed to write {PORTS_PATH}: {e}", flush=True)
-        print("[boot] import app", flush=True)
+            log.warning("[boot] failed to write %s: %s", PORTS_PATH, e)
+        log.info("[boot] import app")
         module, attr = "aimodel.app:app".split(":")
         app = getattr(import_module(module), attr)
-        print("[boot] preflight OpenAPI", flush=True)
-        preflight_openapi_or_point_to_offender(app)
-        print("[boot] compute LAN IP", flush=True)
+        log.info("[boot] preflight OpenAPI (deferred to startup)")
+        schedule_preflight(app)
+        if _TASK_DIAG:
+            install_task_diagnostics(app)
+        log.info("[boot] compute LAN IP")
         IP = lan_ip()
         app.state.port = PORT
         app.state.lan_ip = IP
-        print("[boot] wire helpers", flush=True)
+        app.state.info_body = _info_body(IP, PORT)
+        log.info("[boot] wire helpers")
         mount_frontend(app)
         ensure_health(app)
-        print("\n==================== AI Agent ====================")
-        print(f" Connect from phone:  http://{IP}:{PORT}")
-        print(f" Your code (port):    {PORT}")
-        print(" (Allow Windows Firewall for Private networks)")
-        print("==================================================\n", flush=True)
+        log.info(
+            "\n==================== AI Agent ====================\n"
+            " Connect from phone:  http://%s:%s\n"
+            " Your code (port):    %s\n"
+            " (Allow Windows Firewall for Private networks)\n"
+            "==================================================\n",
+            IP, PORT, PORT,
+        )
         log_level = os.getenv("LOG_LEVEL", "info")
-        print(f"[boot] start uvicorn (log_level={log_level})", flush=True)
-        uvicorn.run(app, host=BIND_HOST, port=PORT, reload=False, workers=1, log_level=log_level)
-        print("[boot] uvicorn exited", flush=True)
+        log.info("[boot] start uvicorn (log_level=%s)", log_level)
+        impl = _uvicorn_impl()
+        # per-request access lines are off unless asked for; they sit on every request's path
+        access_log = os.getenv("LOCALMIND_ACCESS_LOG", "0") in ("1", "true", "TRUE", "yes", "on")
+        log.info("[boot] uvicorn impl %s access_log=%s", impl or "defaults", access_log)
+        uvicorn.run(
+            app, host=BIND_HOST, port=PORT, reload=False, workers=1, log_level=log_level,
+            access_log=access_log, **impl,
+        )
+        log.info("[boot] uvicorn exited")
     except Exception as e:
-        print("[fatal] run_backend.py crashed:", repr(e), flush=True)
-        traceback.print_exc()
+        log.exception("[fatal] run_backend.py crashed: %r", e)
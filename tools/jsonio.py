@@ -0,0 +1,15 @@
+# tools/jsonio.py
+"""Shared JSON writer for the release tools (imported as a sibling module)."""
+import json
+
+try:  # optional: orjson is much faster on big manifests/catalogs
+    import orjson
+
+    def dumps_json(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def dumps_json(obj) -> bytes:
+        # ensure_ascii=False matches orjson's raw UTF-8 output. The two paths
+        # agree on structure and 2-space indent but not byte-for-byte (e.g.
+        # float formatting), so compare the parsed JSON, not the file bytes.
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
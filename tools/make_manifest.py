@@ -1,32 +1,50 @@
 # tools/make_manifest.py
-import hashlib, json, os, sys
+import hashlib, mmap, os, sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def sha256_file(p: Path) -> str:
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024*1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+from jsonio import dumps_json
+
+def sha256_file(p: Path | str) -> str:
+    with open(p, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # 3.11+: the read/update loop runs in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        if os.fstat(f.fileno()).st_size:  # mmap can't map an empty file
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        return h.hexdigest()
+
+def _list_whls(d: Path) -> list[tuple[str, str]]:
+    """(name, path) of the *.whl files in d, sorted like sorted(d.glob("*.whl"))."""
+    fold = str.lower if os.name == "nt" else str  # glob/Path ordering is case-insensitive on Windows
+    with os.scandir(d) as it:
+        whls = [(e.name, e.path) for e in it if fold(e.name).endswith(".whl") and e.is_file()]
+    whls.sort(key=lambda w: fold(w[0]))
+    return whls
 
 def build_manifest(os_tok: str, backend: str, version: str, repo_root: Path) -> dict:
-    wheels = []
+    items = []  # (key, path) in manifest order
     # base (optional)
     base_dir = repo_root / "ext" / "wheels" / os_tok / "base" / version
     if base_dir.exists():
-        for w in sorted(base_dir.glob("*.whl")):
-            key = f"wheels/{os_tok}/base/{version}/{w.name}"
-            wheels.append({"path": key, "sha256": sha256_file(w)})
+        for name, path in _list_whls(base_dir):
+            items.append((f"wheels/{os_tok}/base/{version}/{name}", path))
 
     # backend (required)
     be_dir = repo_root / "ext" / "wheels" / os_tok / backend / version
     if not be_dir.exists():
         raise SystemExit(f"missing backend dir: {be_dir}")
-    if not any(be_dir.glob('*.whl')):
+    be_wheels = _list_whls(be_dir)
+    if not be_wheels:
         raise SystemExit(f"no wheels found in: {be_dir}")
-    for w in sorted(be_dir.glob("*.whl")):
-        key = f"wheels/{os_tok}/{backend}/{version}/{w.name}"
-        wheels.append({"path": key, "sha256": sha256_file(w)})
+    for name, path in be_wheels:
+        items.append((f"wheels/{os_tok}/{backend}/{version}/{name}", path))
+
+    # hashing releases the GIL, so threads hash wheels in parallel; map keeps the order
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        digests = list(ex.map(sha256_file, [w for _, w in items]))
+    wheels = [{"path": key, "sha256": digest} for (key, _), digest in zip(items, digests, strict=True)]
 
     return {
         "schema": 1,
@@ -41,4 +59,4 @@ if __name__ == "__main__":
     os_tok, backend, version = sys.argv[1:4]
     repo_root = Path(__file__).resolve().parents[1]
     m = build_manifest(os_tok, backend, version, repo_root)
-    print(json.dumps(m, indent=2))
+    sys.stdout.buffer.write(dumps_json(m) + b"\n")
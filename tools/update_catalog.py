@@ -2,9 +2,14 @@
 r"""
 Update R2 catalog.json with a new runtime build.
 """
-import argparse, json, os, shutil, subprocess, sys, tempfile
+import argparse, hashlib, hmac, http.client, json, os, shutil, subprocess, sys, tempfile
 from pathlib import Path
 from datetime import datetime, timezone
+from urllib.parse import quote
+
+from jsonio import dumps_json
+
+CATALOG_KEY = "catalog.json"  # object key inside the R2 bucket
 
 def resolve_wrangler_bin(cwd: Path) -> str:
     bin_dir = cwd / "node_modules" / ".bin"
@@ -23,8 +28,69 @@ def run(cmd, cwd=None, check=True):
     print(">", " ".join(map(str, cmd)))
     return subprocess.run(cmd, cwd=cwd, check=check)
 
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+def sigv4_headers(method: str, host: str, path: str, body: bytes, access_key: str,
+                  secret_key: str, region: str, amz_date: str, extra: dict | None = None) -> dict:
+    """S3 SigV4 request headers (incl. Authorization) for a query-less request."""
+    payload_hash = hashlib.sha256(body).hexdigest()
+    headers = {"host": host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+    headers.update({k.lower(): v for k, v in (extra or {}).items()})
+    signed = ";".join(sorted(headers))
+    canonical = "\n".join([
+        method, quote(path, safe="/~"), "",
+        "".join(f"{k}:{str(headers[k]).strip()}\n" for k in sorted(headers)),
+        signed, payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope,
+                         hashlib.sha256(canonical.encode("utf-8")).hexdigest()])
+    key = _hmac(("AWS4" + secret_key).encode("utf-8"), amz_date[:8])
+    for part in (region, "s3", "aws4_request"):
+        key = _hmac(key, part)
+    sig = hmac.new(key, to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["authorization"] = (f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+                                f"SignedHeaders={signed}, Signature={sig}")
+    return headers
+
+class R2Direct:
+    """GET/PUT objects over R2's S3 API on one keep-alive connection (no Node/wrangler)."""
+
+    def __init__(self, account_id: str, access_key: str, secret_key: str, bucket: str):
+        self.host = f"{account_id}.r2.cloudflarestorage.com"
+        self.bucket = bucket
+        self.access_key, self.secret_key = access_key, secret_key
+        self.conn = http.client.HTTPSConnection(self.host, timeout=60)
+
+    @classmethod
+    def from_env(cls):
+        env = [os.getenv(k) for k in ("CLOUDFLARE_ACCOUNT_ID", "R2_ACCESS_KEY_ID", "R2_SECRET_ACCESS_KEY")]
+        if not all(env):
+            return None
+        return cls(*env, os.getenv("R2_BUCKET", "runtimes"))
+
+    def request(self, method: str, key: str, body: bytes = b"", content_type: str | None = None):
+        path = f"/{self.bucket}/{key}"
+        print(">", method, f"r2://{self.bucket}/{key}")
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        extra = {"content-type": content_type} if content_type else None
+        headers = sigv4_headers(method, self.host, path, body, self.access_key, self.secret_key,
+                                "auto", amz_date, extra)
+        self.conn.request(method, quote(path, safe="/~"), body=body or None, headers=headers)
+        resp = self.conn.getresponse()
+        return resp.status, resp.read()
+
+    def close(self):
+        self.conn.close()
+
 def load_json_any_encoding(p: Path) -> dict:
     raw = p.read_bytes()
+    # json.loads sniffs UTF-8/16/32 (and a UTF-8 BOM) from the first bytes itself
+    try:
+        return json.loads(raw)
+    except ValueError:  # JSONDecodeError / UnicodeDecodeError
+        pass
     for enc in ("utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be"):
         try:
             return json.loads(raw.decode(enc))
@@ -42,26 +108,46 @@ def main():
     ap.add_argument("--set-latest", action="store_true")
     ap.add_argument("--notes", default=None)
     ap.add_argument("--channel", default=None)
+    ap.add_argument("--no-wrangler", action="store_true",
+                    help="talk to R2's S3 API directly (needs CLOUDFLARE_ACCOUNT_ID, "
+                         "R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY; optional R2_BUCKET)")
     args = ap.parse_args()
 
+    r2 = None
+    if args.no_wrangler:
+        r2 = R2Direct.from_env()
+        if r2 is None:
+            print("R2 credentials not set; falling back to wrangler.")
+
     cwd = Path(args.cwd).resolve()
-    if not (cwd / "wrangler.toml").exists():
+    if r2 is None and not (cwd / "wrangler.toml").exists():
         print(f"ERROR: wrangler.toml not found under {cwd}", file=sys.stderr)
         sys.exit(2)
 
-    WRANGLER = resolve_wrangler_bin(cwd)
+    WRANGLER = resolve_wrangler_bin(cwd) if r2 is None else None
     tmpdir = Path(tempfile.mkdtemp(prefix="catalog_update_"))
     local_catalog = tmpdir / "catalog.json"
 
     # 1) fetch or init
-    try:
-        run([WRANGLER, "r2", "object", "get", "--remote",
-             "runtimes/catalog.json", "--file", str(local_catalog)],
-            cwd=str(cwd), check=True)
-        catalog = load_json_any_encoding(local_catalog)
-    except subprocess.CalledProcessError:
-        print("No existing catalog.json; creating a new one.")
-        catalog = {"schema": 1, "latest": {}, "builds": []}
+    if r2 is not None:
+        status, body = r2.request("GET", CATALOG_KEY)
+        if status == 200:
+            local_catalog.write_bytes(body)
+            catalog = load_json_any_encoding(local_catalog)
+        elif status == 404:
+            print("No existing catalog.json; creating a new one.")
+            catalog = {"schema": 1, "latest": {}, "builds": []}
+        else:
+            raise SystemExit(f"R2 GET {CATALOG_KEY} failed: HTTP {status} {body[:200]!r}")
+    else:
+        try:
+            run([WRANGLER, "r2", "object", "get", "--remote",
+                 f"runtimes/{CATALOG_KEY}", "--file", str(local_catalog)],
+                cwd=str(cwd), check=True)
+            catalog = load_json_any_encoding(local_catalog)
+        except subprocess.CalledProcessError:
+            print("No existing catalog.json; creating a new one.")
+            catalog = {"schema": 1, "latest": {}, "builds": []}
 
     # 2) upsert build
     manifest_key = args.manifest or f"manifests/{args.os}/{args.backend}/{args.version}.json"
@@ -89,11 +175,17 @@ def main():
         latest[args.os][args.backend] = args.version
 
     # 3) write UTF-8 (normalized) and upload with content-type
-    local_catalog.write_text(json.dumps(catalog, indent=2), encoding="utf-8")
-    run([WRANGLER, "r2", "object", "put", "--remote",
-         "runtimes/catalog.json", "--file", str(local_catalog),
-         "--content-type", "application/json"],
-        cwd=str(cwd), check=True)
+    local_catalog.write_bytes(dumps_json(catalog))
+    if r2 is not None:
+        status, body = r2.request("PUT", CATALOG_KEY, local_catalog.read_bytes(), "application/json")
+        r2.close()
+        if status != 200:
+            raise SystemExit(f"R2 PUT {CATALOG_KEY} failed: HTTP {status} {body[:200]!r}")
+    else:
+        run([WRANGLER, "r2", "object", "put", "--remote",
+             f"runtimes/{CATALOG_KEY}", "--file", str(local_catalog),
+             "--content-type", "application/json"],
+            cwd=str(cwd), check=True)
 
     print("\n✅ catalog.json updated.")
     print("   View: https://lic-server.localmind.workers.dev/runtime/catalog")